@@ -1,18 +1,32 @@
 from capacities import EvaluationCapacity, CommunicativeCapacity
 from skills import InvestmentSkill
 from events import MarketEvent, FipaPerformative, TransactionType
+from order_book import OrderBook
+from indicators import IndicatorService
+from tracing import (TRACER, DEBUG, INFO, AGENT_INIT, MARKET_OPEN, INVESTOR_INIT, PRICE, EXECUTED, FILL,
+                     FILL_FAILED, DECISION, WAITING, PROPOSE_ACCEPTED, PROPOSE_REJECTED)
 
 import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from price_models import PriceModel  # importa numpy: solo se carga si la corrida usa un modelo
 
 class Agent:
     """Clase base para todos los agentes."""
 
+    # Ruteo de mensajes: performative -> nombre del método que lo atiende (ver MessageDispatcher)
+    HANDLERS = {}
+    # True en las poblaciones vectorizadas (population.py): WebBoot las reconoce sin importar numpy
+    IS_POPULATION = False
+
     def __init__(self, id: str):
         self.id = id
         self.comms = CommunicativeCapacity()
 
     def initialize(self):
-        print(f"Agente {self.id} inicializado.")
+        if TRACER.level <= INFO:
+            TRACER.emit(AGENT_INIT, self.id)
 
     def run_cycle(self, tick: int):
         """Simula un tick/latido o paso de tiempo."""
@@ -21,83 +35,275 @@ class Agent:
 class MarketAgent(Agent, EvaluationCapacity):
     """El agente que simula el mercado de la criptomoneda."""
 
-    def __init__(self, id: str, initial_price: float = 100.0):
+    HANDLERS = {
+        FipaPerformative.CFP: 'process_cfp',
+        FipaPerformative.ACCEPT_PROPOSAL: 'process_accept',
+    }
+
+    def __init__(self, id: str, initial_price: float = 100.0, use_order_book: bool = False,
+                 maker_depth: float = 10.0, maker_levels: int = 5, maker_step: float = 0.005,
+                 rng: random.Random = None, price_model: 'PriceModel' = None):
         super().__init__(id)
+        self.rng = rng if rng is not None else random  # generador propio para simulaciones con semilla
+        self.price_model = price_model  # sin modelo se usa la fluctuación uniforme original
         self.price_history = [initial_price]
         self.current_price = initial_price
+        # Indicadores técnicos compartidos por todos los inversores (se actualizan una vez por tick)
+        self.indicators = IndicatorService(self.price_history)
+        # Libro de ordenes opcional: si esta activo, los precios de las transacciones salen del matching
+        self.order_book = OrderBook() if use_order_book else None
+        self.maker_depth = maker_depth  # cantidad ofrecida por el mercado en cada nivel (Proveedor de Liquidez)
+        self.maker_levels = maker_levels
+        self.maker_step = maker_step
+        self._maker_orders = []  # ids de las cotizaciones del mercado en el libro
+        self._incoming_orders = []  # ordenes aceptadas en el tick: (owner, side, limit, quantity)
 
     def initialize(self):
         super().initialize()
-        print(f"Precio inicial de la criptomoneda: ${self.current_price:.2f}")
+        if TRACER.level <= INFO:
+            TRACER.emit(MARKET_OPEN, self.id, self.current_price)
 
     def update_price(self):
         """Simula una fluctuación aleatoria del precio."""
-        change = random.uniform(-5.0, 5.0)  # Cambio de precio simulado
-        new_price = self.current_price * (1 + change / 100)
+        if self.price_model is not None:
+            new_price = self.price_model.next_price(self.current_price)
+        else:
+            change = self.rng.uniform(-5.0, 5.0)  # Cambio de precio simulado
+            new_price = self.current_price * (1 + change / 100)
         self.current_price = max(1.0, new_price)  # para que el precio no baje de 1.0
         self.price_history.append(self.current_price)
-        print(f"--- Atencion! Nuevo Precio: ${self.current_price:.2f} ---")
+        self.indicators.update(self.current_price)
+        if TRACER.level <= INFO:
+            TRACER.emit(PRICE, self.id, self.current_price)
 
     def run_cycle(self, tick: int):
         self.update_price()
+        if self.order_book is not None:
+            self._refresh_quotes()
+
+    def _refresh_quotes(self):
+        """Reemplaza las cotizaciones del mercado en el libro alrededor del precio actual."""
+        for order_id in self._maker_orders:
+            self.order_book.cancel(order_id)
+        self._maker_orders = []
+        for level in range(self.maker_levels):
+            offset = 0.01 + level * self.maker_step  # el primer nivel respeta el spread de +-1%
+            bid = self.order_book.add(self.id, TransactionType.BUY, self.current_price * (1 - offset), self.maker_depth)
+            ask = self.order_book.add(self.id, TransactionType.SELL, self.current_price * (1 + offset), self.maker_depth)
+            self._maker_orders.extend((bid.order_id, ask.order_id))
 
     def process_cfp(self, event: MarketEvent):
         """Responde a un CFP con una PROPOSE."""
-        # La oferta es simplificada: solo se opera a precio de mercado.
+        if self.order_book is not None:
+            # Con libro de ordenes se ofrece el spread real del libro
+            best_buy = self.order_book.best_bid() or self.current_price * 0.99
+            best_sell = self.order_book.best_ask() or self.current_price * 1.01
+        else:
+            # La oferta es simplificada: solo se opera a precio de mercado.
+            best_buy = self.current_price * 0.99  # un poco menos para compra
+            best_sell = self.current_price * 1.01  # un poco más para venta
         offer = {
             "price": self.current_price,  # algun agente quiere comprar/vender al precio de mercado
-            "best_buy": self.current_price * 0.99,  # un poco menos para compra
-            "best_sell": self.current_price * 1.01  # un poco más para venta
+            "best_buy": best_buy,
+            "best_sell": best_sell,
+            "type": event.content.get("type")
         }
-        response = MarketEvent(self.id, event.sender, FipaPerformative.PROPOSE, offer)
+        response = self.comms.create_event(self.id, event.sender, FipaPerformative.PROPOSE, offer)
         self.comms.send_event(response)
 
     def process_accept(self, event: MarketEvent):
         """Ejecuta una transacción y responde con INFORM."""
         transaction_type = event.content.get("type", "UNKNOWN")
 
-        print(f"*** TRANSACCIÓN EJECUTADA: {event.sender} realiza {transaction_type} en ${self.current_price:.2f} ***")
+        if self.order_book is not None:
+            # La orden se cruza en bloque con el resto de las del tick (ver match_orders)
+            limit = event.content.get("limit", event.content.get("price"))
+            self._incoming_orders.append((event.sender, TransactionType(transaction_type), limit,
+                                          event.content.get("count", 1)))
+            return
+
+        if TRACER.level <= INFO:
+            TRACER.emit(EXECUTED, self.id, event.sender, transaction_type, self.current_price)
 
-        response = MarketEvent(self.id, event.sender, FipaPerformative.INFORM,
-                               {"status": "success", "price": self.current_price, "action": transaction_type})
+        response = self.comms.create_event(self.id, event.sender, FipaPerformative.INFORM,
+                               {"status": "success", "price": self.current_price, "action": transaction_type,
+                                "count": event.content.get("count", 1)})
         self.comms.send_event(response)
 
+    def match_orders(self):
+        """
+        Cruza en bloque todas las ordenes aceptadas en el tick con prioridad precio-tiempo.
+        Envia un INFORM por cada ejecucion y uno de fallo por el remanente no ejecutado.
+        El precio actual pasa a ser el de la ultima operacion.
+        """
+        if self.order_book is None or not self._incoming_orders:
+            return []
+
+        orders, trades = self.order_book.submit_many(self._incoming_orders)
+        self._incoming_orders = []
+
+        reports = []  # (inversor, contenido del INFORM)
+        for trade in trades:
+            maker_side = TransactionType.SELL if trade.taker_side == TransactionType.BUY else TransactionType.BUY
+            for owner, side in ((trade.taker, trade.taker_side), (trade.maker, maker_side)):
+                if owner == self.id:
+                    continue
+                reports.append((owner, {"status": "success", "price": trade.price, "action": side.value,
+                                        "count": trade.quantity}))
+
+        # Las ordenes de los inversores no quedan en el libro entre ticks
+        for order in orders:
+            if order.quantity > 0:
+                self.order_book.cancel(order.order_id)
+                reports.append((order.owner, {"status": "failure", "action": order.side.value, "count": order.quantity}))
+        self._send_informs(reports)
+
+        if trades:
+            self.current_price = trades[-1].price
+            self.price_history[-1] = self.current_price  # precio de cierre del tick
+            self.indicators.revise(self.current_price)
+        return trades
+
+    def _send_informs(self, reports):
+        """Envía un INFORM por cada resultado (inversor, contenido)."""
+        for owner, content in reports:
+            self.comms.send_event(self.comms.create_event(self.id, owner, FipaPerformative.INFORM, content))
+
+    def get_state(self) -> dict:
+        """Estado completo del mercado para checkpoints (precio, historial, generador y libro)."""
+        return {
+            'id': self.id,
+            'current_price': self.current_price,
+            'price_history': self.price_history,
+            'rng_state': self.rng.getstate(),
+            'price_model': self.price_model,
+            'indicators': self.indicators,
+            'maker': (self.maker_depth, self.maker_levels, self.maker_step),
+            'order_book': self.order_book.get_state() if self.order_book is not None else None,
+            'maker_orders': self._maker_orders,
+            'incoming_orders': self._incoming_orders,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'MarketAgent':
+        rng = random.Random()
+        rng.setstate(state['rng_state'])
+        maker_depth, maker_levels, maker_step = state['maker']
+        market = cls(state['id'], state['current_price'], maker_depth=maker_depth, maker_levels=maker_levels,
+                     maker_step=maker_step, rng=rng, price_model=state.get('price_model'))
+        market.price_history = state['price_history']
+        market.indicators = state['indicators']  # comparte la lista price_history del mismo checkpoint
+        if state['order_book'] is not None:
+            market.order_book = OrderBook.from_state(state['order_book'])
+        market._maker_orders = state['maker_orders']
+        market._incoming_orders = state['incoming_orders']
+        return market
+
+class BatchMarketAgent(MarketAgent):
+    """
+    Mercado con rondas del Contract Net en lote: junta todos los CFP de una pasada del despacho y
+    responde con un PROPOSE multicast por tipo de transacción; junta los ACCEPT_PROPOSAL y confirma
+    con un único INFORM multicast cuyo contenido trae, en "fills", los resultados de cada inversor.
+    Los inversores siguen viendo la misma secuencia CFP -> PROPOSE -> ACCEPT_PROPOSAL -> INFORM.
+    """
+
+    BATCH_HANDLERS = {
+        FipaPerformative.CFP: 'process_cfp_batch',
+        FipaPerformative.ACCEPT_PROPOSAL: 'process_accept_batch',
+    }
+
+    def process_cfp_batch(self, events):
+        """Un PROPOSE por tipo de transacción, dirigido a todos los que enviaron un CFP de ese tipo."""
+        receivers = {}
+        for event in events:
+            receivers.setdefault(event.content.get("type"), []).append(event.sender)
+        if self.order_book is not None:
+            best_buy = self.order_book.best_bid() or self.current_price * 0.99
+            best_sell = self.order_book.best_ask() or self.current_price * 1.01
+        else:
+            best_buy = self.current_price * 0.99
+            best_sell = self.current_price * 1.01
+        for transaction_type, senders in receivers.items():
+            offer = {"price": self.current_price, "best_buy": best_buy, "best_sell": best_sell, "type": transaction_type}
+            self.comms.send_event(self.comms.create_event(self.id, tuple(senders), FipaPerformative.PROPOSE, offer))
+
+    def process_accept_batch(self, events):
+        """Ejecuta todas las aceptaciones de la pasada y las confirma con un solo INFORM."""
+        if self.order_book is not None:
+            for event in events:
+                self.process_accept(event)  # se cruzan en match_orders
+            return
+
+        reports = []
+        for event in events:
+            transaction_type = event.content.get("type", "UNKNOWN")
+            if TRACER.level <= INFO:
+                TRACER.emit(EXECUTED, self.id, event.sender, transaction_type, self.current_price)
+            reports.append((event.sender, {"status": "success", "price": self.current_price, "action": transaction_type,
+                                           "count": event.content.get("count", 1)}))
+        self._send_informs(reports)
+
+    def _send_informs(self, reports):
+        """Un único INFORM multicast; "fills" tiene la lista de resultados de cada receptor."""
+        if not reports:
+            return
+        fills = {}
+        for owner, content in reports:
+            fills.setdefault(owner, []).append(content)
+        self.comms.send_event(self.comms.create_event(self.id, tuple(fills), FipaPerformative.INFORM, {"fills": fills}))
+
+
 class InvestorAgent(Agent, EvaluationCapacity):
     """Agente inversor con personalidad (tolerancia al riesgo).
         Trabajo futuro: conectar con OPENA API para que pueda tomar una decision mas precisa.
     """
-    def __init__(self, id: str, risk_tolerance: float, fiat_balance: float = 1000.0, crypto_balance: float = 10.0):
+
+    HANDLERS = {
+        FipaPerformative.PROPOSE: 'handle_propose',
+        FipaPerformative.INFORM: 'handle_inform',
+    }
+
+    def __init__(self, id: str, risk_tolerance: float, fiat_balance: float = 1000.0, crypto_balance: float = 10.0,
+                 skill_class: type = InvestmentSkill, market_id: str = "Mercado01"):
         super().__init__(id)
         self.risk_tolerance = risk_tolerance
-        self.skill = InvestmentSkill(risk_tolerance)
+        self.skill = skill_class(risk_tolerance)
+        self.indicators = None  # IndicatorService del mercado (ver attach_indicators)
         self.fiat_balance = fiat_balance
         self.crypto_balance = crypto_balance
-        self.market_id = "Mercado01"
+        self.market_id = market_id
         self.pending_action = None  # Almacena la ultima accion que se hizo (BUY o SELL)
 
     def initialize(self):
         super().initialize()
-        personality = "Impulsivo" if self.risk_tolerance > 0.4 else "Racional"
-        print(f"Agente {self.id} inicializado. Personalidad: {personality} (Riesgo: {self.risk_tolerance:.2f})")
+        if TRACER.level <= INFO:
+            TRACER.emit(INVESTOR_INIT, self.id, self.risk_tolerance)
+
+    def attach_indicators(self, indicators):
+        """Conecta el inversor a los indicadores del mercado y registra los que usa su habilidad."""
+        indicators.require_all(self.skill.INDICATORS)
+        self.indicators = indicators
 
     def run_cycle(self, tick: int, market_history: list):
         if len(market_history) < 2:
-            print(f"{self.id}: Esperando más datos de mercado.")
+            if TRACER.level <= DEBUG:
+                TRACER.emit(WAITING, self.id)
             return
 
         current_price = market_history[-1]
         price_change = self.evaluate_price_change(current_price, market_history)
         
-        action, amount = self.skill.decide_transaction(price_change)
+        action, amount = self.skill.decide_transaction(price_change, self.indicators)
 
         if action:
             # Almacenar la acción para usarla cuando recibamos el PROPOSE
             self.pending_action = action
-            print(f"[{self.id} DECISION: {action.value.upper()} | Var: {price_change*100:.2f}%] -> Enviando CFP al Mercado...")
+            if TRACER.level <= DEBUG:
+                TRACER.emit(DECISION, self.id, action.value, price_change)
             
             # 1. CFP: Iniciar el FIPA Contract Net Protocol
             cfp_content = {"request": "offer_for_trade", "type": action.value, "amount": amount}
-            cfp_event = MarketEvent(self.id, self.market_id, FipaPerformative.CFP, cfp_content)
+            cfp_event = self.comms.create_event(self.id, self.market_id, FipaPerformative.CFP, cfp_content)
             self.comms.send_event(cfp_event)
             # Nota: La respuesta PROPOSE se maneja con el handle_propose en el siguiente tick.
 
@@ -109,18 +315,21 @@ class InvestorAgent(Agent, EvaluationCapacity):
         
         # Verificar que tenemos una acción pendiente
         if self.pending_action is None:
-            print(f"[{self.id} PROPOSE RECIBIDO: ${price:.2f}] -> Sin acción pendiente, rechazando.")
+            if TRACER.level <= DEBUG:
+                TRACER.emit(PROPOSE_REJECTED, self.id, price)
             return
         
         # Determinar el tipo de transacción basado en la acción pendiente
         transaction_type = self.pending_action  # TransactionType.BUY o TransactionType.SELL
         
-        print(f"[{self.id} PROPOSE RECIBIDO: ${price:.2f}] -> Aceptando oferta para {transaction_type.value.upper()}.")
+        if TRACER.level <= DEBUG:
+            TRACER.emit(PROPOSE_ACCEPTED, self.id, price, transaction_type.value)
         
         # 2. ACCEPT_PROPOSAL
         # Enviamos el tipo de transacción correcto (BUY o SELL)
-        accept_content = {"price": price, "type": transaction_type.value}
-        accept_event = MarketEvent(self.id, self.market_id, FipaPerformative.ACCEPT_PROPOSAL, accept_content)
+        limit = event.content.get("best_sell" if transaction_type == TransactionType.BUY else "best_buy", price)
+        accept_content = {"price": price, "type": transaction_type.value, "limit": limit}
+        accept_event = self.comms.create_event(self.id, self.market_id, FipaPerformative.ACCEPT_PROPOSAL, accept_content)
         self.comms.send_event(accept_event)
         
         # Limpiar la acción pendiente después de enviar el ACCEPT
@@ -128,9 +337,19 @@ class InvestorAgent(Agent, EvaluationCapacity):
 
     def handle_inform(self, event: MarketEvent):
         """Maneja el INFORM (confirmación de transacción)."""
-        status = event.content.get("status")
-        price = event.content.get("price")
-        action = event.content.get("action")
+        fills = event.content.get("fills")
+        if fills is not None:
+            # INFORM en lote (BatchMarketAgent): solo los resultados de este inversor
+            for fill in fills.get(self.id, ()):
+                self._apply_fill(fill)
+        else:
+            self._apply_fill(event.content)
+
+    def _apply_fill(self, content):
+        """Aplica el resultado de una transacción (contenido de un INFORM)."""
+        status = content.get("status")
+        price = content.get("price")
+        action = content.get("action")
         
         if status == "success":
             # Actualización simplificada de cartera
@@ -142,6 +361,27 @@ class InvestorAgent(Agent, EvaluationCapacity):
                 self.crypto_balance -= amount
                 self.fiat_balance += price * amount
 
-            print(f"[{self.id} INFORM: {action.upper()} OK en ${price:.2f}] Saldo Fiat: ${self.fiat_balance:.2f} | Saldo Cripto: {self.crypto_balance:.2f}")
-        else:
-            print(f"[{self.id} INFORM: Transacción fallida.]")
\ No newline at end of file
+            if TRACER.level <= INFO:
+                TRACER.emit(FILL, self.id, action, price, self.fiat_balance, self.crypto_balance)
+        elif TRACER.level <= INFO:
+            TRACER.emit(FILL_FAILED, self.id)
+
+    def get_state(self) -> dict:
+        """Estado del inversor para checkpoints."""
+        return {
+            'id': self.id,
+            'risk_tolerance': self.risk_tolerance,
+            'fiat_balance': self.fiat_balance,
+            'crypto_balance': self.crypto_balance,
+            'market_id': self.market_id,
+            'pending_action': self.pending_action,
+            'skill_class': type(self.skill),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'InvestorAgent':
+        investor = cls(state['id'], state['risk_tolerance'], state['fiat_balance'], state['crypto_balance'],
+                       skill_class=state.get('skill_class', InvestmentSkill))
+        investor.market_id = state['market_id']
+        investor.pending_action = state['pending_action']
+        return investor
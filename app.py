@@ -1,143 +1,52 @@
 # app.py
-from flask import Flask, render_template, jsonify, request
-from agents import MarketAgent, InvestorAgent
-from events import MarketEvent, FipaPerformative, TransactionType
-from message_dispatcher import MessageDispatcher
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from simulation import WebBoot, scenario_params, create_simulator  # WebBoot: `from app import WebBoot` sigue andando
+from sweep import run_sweep, DEFAULT_RISK_MIX
+from metrics import REGISTRY
+from jobs import JobManager, JobQueueFull
+from columnar import COLUMNAR_MIMETYPE, encode_result
+from series_store import SeriesStore
+from result_cache import ResultCache, HIT, EXTENDED, MISS
+from markets import MultiMarketBoot, MARKET_PARAMS
+from tracing import configure_from_env
 import json
+import logging
+import os
+import uuid
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
-class WebBoot:
-    """Boot que captura datos para la web."""
-    def __init__(self):
-        self.agents = {}
-        self.market = None
-        self.dispatcher = MessageDispatcher()
-        self.simulation_data = {
-            'price_history': [],
-            'cycles': [],
-            'transactions': [],
-            'agent_states': [],
-            'logs': []
-        }
-    
-    def initialize_agents(self, initial_price=100.0):
-        """Crea los agentes e inicializa el sistema."""
-        self.dispatcher.clear_queue()
-        
-        # Agente Mercado solo 1 por ahora
-        self.market = MarketAgent("Mercado01", initial_price=initial_price)
-        self.agents[self.market.id] = self.market
-        self.dispatcher.register_agent(self.market.id, self.market)
-        self.market.initialize()
-        
-        # Agentes Inversores con diferentes personalidades
-        inv_racional = InvestorAgent("InversorRacional_A1", risk_tolerance=0.1, fiat_balance=500.0, crypto_balance=5.0)
-        self.agents[inv_racional.id] = inv_racional
-        self.dispatcher.register_agent(inv_racional.id, inv_racional)
-        inv_racional.initialize()
-
-        inv_impulsivo = InvestorAgent("InversorImpulsivo_B", risk_tolerance=0.6, fiat_balance=500.0, crypto_balance=5.0)
-        self.agents[inv_impulsivo.id] = inv_impulsivo
-        self.dispatcher.register_agent(inv_impulsivo.id, inv_impulsivo)
-        inv_impulsivo.initialize()
-        
-        inv_medio = InvestorAgent("InversorMedio_C", risk_tolerance=0.3, fiat_balance=500.0, crypto_balance=5.0)
-        self.agents[inv_medio.id] = inv_medio
-        self.dispatcher.register_agent(inv_medio.id, inv_medio)
-        inv_medio.initialize()
-        
-        # Configurar los agentes para usar el dispatcher
-        for agent in self.agents.values():
-            agent.comms.set_dispatcher(self.dispatcher)
-        
-        # Aqui guardo el estado inicial de los agentes antes de comenzar la simulación.
-        self._capture_agent_states(0)
-    
-    def _capture_agent_states(self, cycle):
-        """Captura el estado de todos los agentes."""
-        states = {
-            'cycle': cycle,
-            'market_price': self.market.current_price,
-            'investors': {}
-        }
-        
-        for agent_id, agent in self.agents.items():
-            if isinstance(agent, InvestorAgent):
-                states['investors'][agent_id] = {
-                    'fiat_balance': round(agent.fiat_balance, 2),
-                    'crypto_balance': round(agent.crypto_balance, 2),
-                    'risk_tolerance': agent.risk_tolerance
-                }
-        
-        self.simulation_data['agent_states'].append(states)
-        self.simulation_data['price_history'].append(self.market.current_price)
-    
-    def _dispatch_messages(self, max_iterations=10):
-        """Procesa los mensajes de la cola usando el MessageDispatcher."""
-        # Despachar mensajes usando el dispatcher
-        # La captura de transacciones se hace interceptando los eventos antes del dispatch
-        processed = 0
-        iterations = 0
-        
-        while self.dispatcher.message_queue and iterations < max_iterations:
-            # Procesar todos los mensajes actuales en la cola
-            current_batch = list(self.dispatcher.message_queue)
-            self.dispatcher.message_queue.clear()
-            
-            for event in current_batch:
-                # Capturar transacciones antes de procesar
-                if event.performative.value == "inform" and event.content.get("status") == "success":
-                    cycle = self.current_cycle if hasattr(self, 'current_cycle') else len(self.simulation_data['price_history'])
-                    self.simulation_data['transactions'].append({
-                        'cycle': cycle,
-                        'sender': event.sender,
-                        'receiver': event.receiver,
-                        'action': event.content.get("action"),
-                        'price': event.content.get("price")
-                    })
-                
-                # Procesar el mensaje normalmente
-                target_agent = self.dispatcher.agents.get(event.receiver)
-                if target_agent:
-                    self.dispatcher._deliver_to_agent(target_agent, event)
-                    processed += 1
-                else:
-                    # Si no hay receptor, mantener el mensaje en la cola
-                    self.dispatcher.message_queue.append(event)
-            
-            iterations += 1
-    
-    def run_simulation(self, cycles: int = 5):
-        """Ejecuta la simulación y captura datos."""
-        self.simulation_data = {
-            'price_history': [],
-            'cycles': [],
-            'transactions': [],
-            'agent_states': [],
-            'logs': []
-        }
-        
-        self.current_cycle = 0
-        
-        for t in range(1, cycles + 1):
-            self.current_cycle = t
-            
-            # 1. El mercado actualiza el precio
-            self.market.run_cycle(t)
-            
-            # 2. Los inversores toman decisiones
-            for agent in self.agents.values():
-                if isinstance(agent, InvestorAgent):
-                    agent.run_cycle(t, self.market.price_history)
-            
-            # 3. Despacho de Mensajes (itera hasta procesar todos)
-            self._dispatch_messages()
-            
-            # 4. Capturar estado del ciclo
-            self._capture_agent_states(t)
-        
-        return self.simulation_data
+# Desde cuántos ciclos se guarda la serie de /api/simulate: el frontend pasa a consultas por rango
+# por encima de STREAM_MAX_CYCLES (200); más cortas solo si el cliente pide "store_series"
+SERIES_MIN_CYCLES = 200
+configure_from_env()  # trazas: SIMULADOR_TRACE_LEVEL / SIMULADOR_TRACE_FILE (ver tracing.py)
+
+def _create_simulator(data, keep_history=True):
+    """Crea e inicializa un WebBoot con los parámetros del request (la API web no lee archivos del servidor)."""
+    return create_simulator(data, allow_files=False, keep_history=keep_history)
+
+def _run_cached(data, cycles):
+    """
+    Corre la simulación pasando por el caché de resultados. Solo se cachean las corridas con semilla
+    y sin perfilado (los tiempos medidos no se repiten). Retorna (simulador, estado del caché).
+    """
+    params = scenario_params(data)
+    key = result_cache.key(params) if params['seed'] is not None and not params['profile'] else None
+    simulator, status = result_cache.lookup(key, cycles) if key is not None else (None, MISS)
+    if simulator is None:
+        simulator = _create_simulator(data)
+        simulator.run_simulation(cycles=cycles)
+    elif status == EXTENDED:
+        simulator.resume_simulation(cycles)
+    if key is not None and status != HIT:
+        result_cache.store(key, simulator)
+    return simulator, status
+
+@app.errorhandler(ValueError)
+def invalid_parameters(error):
+    """Parámetros inválidos en el request (p. ej. un modelo de precio desconocido)."""
+    return jsonify({'error': str(error)}), 400
 
 @app.route('/')
 def index():
@@ -146,31 +55,202 @@ def index():
 
 @app.route('/api/simulate', methods=['POST'])
 def simulate():
-    """Endpoint para ejecutar una simulación."""
+    """Endpoint para ejecutar una simulación.
+    Responde JSON, o el formato binario columnar (ver columnar.py) si el cliente lo pide en Accept.
+    Las corridas con semilla pasan por el caché de resultados (header X-Simulation-Cache: hit, extended o miss)."""
     data = request.json
     cycles = data.get('cycles', 8)
-    initial_price = data.get('initial_price', 100.0)
     
-    simulator = WebBoot()
-    simulator.initialize_agents(initial_price=initial_price)
-    result = simulator.run_simulation(cycles=cycles)
-    
-    # Calcular estadísticas
-    prices = result['price_history']
-    print(result['transactions'])
-    if prices:
-        result['statistics'] = {
-            'initial_price': prices[0],
-            'final_price': prices[-1],
-            'max_price': max(prices),
-            'min_price': min(prices),
-            'price_change': prices[-1] - prices[0],
-            'price_change_percent': ((prices[-1] - prices[0]) / prices[0]) * 100,
-            'total_transactions': len(result['transactions']),
-            'buy_transactions': len([t for t in result['transactions'] if t['action'] == TransactionType.BUY.value]),
-            'sell_transactions': len([t for t in result['transactions'] if t['action'] == TransactionType.SELL.value])
-        }
+    simulator, cache_status = _run_cached(data, cycles)
+    result = dict(simulator.simulation_data)
     
+    # Estadísticas acumuladas durante la corrida
+    if result['price_history']:
+        result['statistics'] = simulator.stats.summary()
+    if simulator.profiler is not None:
+        result['profile'] = simulator.profiler.to_dict()
+    # La serie queda guardada para consultarla por rangos en /api/runs/<run_id>/prices
+    if cycles > SERIES_MIN_CYCLES or data.get('store_series'):
+        try:
+            result['run_id'] = series_store.save(uuid.uuid4().hex, result['price_history'])
+        except OSError:
+            # Sin run_id el frontend grafica la serie completa de la respuesta
+            logger.exception("No se pudo guardar la serie de la corrida")
+
+    if request.accept_mimetypes.best == COLUMNAR_MIMETYPE:
+        response = Response(encode_result(result, result.get('statistics'), result.get('profile')),
+                            mimetype=COLUMNAR_MIMETYPE)
+    else:
+        response = jsonify(result)
+    response.headers['X-Simulation-Cache'] = cache_status
+    return response
+
+@app.route('/api/simulate/stream', methods=['POST'])
+def simulate_stream():
+    """
+    Endpoint de simulación en streaming: envía un registro por ciclo a medida que se calcula.
+    Formato NDJSON por defecto, o Server-Sent Events si el cliente acepta text/event-stream.
+    El último registro ({"type": "summary"}) trae las estadísticas finales.
+    """
+    data = request.json
+    cycles = data.get('cycles', 8)
+    use_sse = request.accept_mimetypes.best == 'text/event-stream'
+
+    # Los registros se envían y se descartan: el servidor no guarda el historial de estados
+    simulator = _create_simulator(data, keep_history=False)
+
+    def encode(record):
+        line = json.dumps(record)
+        return f"data: {line}\n\n" if use_sse else line + "\n"
+
+    def generate():
+        for record in simulator.iter_simulation(cycles):
+            record['type'] = 'cycle'
+            record['statistics'] = simulator.stats.summary(include_pnl=False)
+            yield encode(record)
+
+        summary = {'type': 'summary', 'agent_state': simulator.current_state()}
+        if simulator.stats.ticks:
+            summary['statistics'] = simulator.stats.summary()
+        if simulator.profiler is not None:
+            summary['profile'] = simulator.profiler.to_dict()
+        yield encode(summary)
+
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route('/api/markets/simulate', methods=['POST'])
+def simulate_markets():
+    """
+    Simulación con varios mercados a la vez (ver markets.py): un shard por mercado, repartidos en
+    procesos worker. "markets" es la lista de mercados; los parámetros comunes se aplican a todos.
+    """
+    data = request.json
+    workers = data.get('workers')
+    if workers is not None:
+        workers = min(int(workers), os.cpu_count() or 1)  # no más procesos que núcleos
+    boot = MultiMarketBoot(data.get('markets', []), seed=data.get('seed'), workers=workers,
+                           sync_every=data.get('sync_every', 1),
+                           snapshot_every=data.get('snapshot_every', 50),
+                           sample_every=data.get('sample_every', 1),
+                           allow_files=False,
+                           **{key: data[key] for key in MARKET_PARAMS if key in data})
+    return jsonify(boot.run_simulation(data.get('cycles', 8)))
+
+# Caché de resultados de corridas con semilla (memoria + disco, sobrevive a los reinicios)
+result_cache = ResultCache(os.environ.get('SIMULADOR_CACHE_DIR'))
+
+# Series de precios de las corridas terminadas, en disco (memory-map) para graficarlas por rangos
+series_store = SeriesStore(os.environ.get('SIMULADOR_SERIES_DIR'))
+
+# Trabajos asincrónicos: pool acotado de workers compartido por todos los clientes.
+# Al terminar, la serie del trabajo se guarda con su id de trabajo como id de corrida.
+job_manager = JobManager(_create_simulator,
+                         on_done=lambda job: series_store.save(job.id, job.simulator.simulation_data['price_history']))
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Encola una simulación y devuelve su id. Si la cola está llena responde 429."""
+    data = request.json
+    try:
+        job = job_manager.submit(data, cycles=data.get('cycles', 8))
+    except JobQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Estado y progreso (ciclo actual) de un trabajo."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo inexistente'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Resultados del trabajo: parciales mientras corre, completos al terminar."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo inexistente'}), 404
+    return jsonify(job.result())
+
+@app.route('/api/jobs/<job_id>/state/<int:cycle>', methods=['GET'])
+def job_state(job_id, cycle):
+    """Estado completo de los agentes en un ciclo, reconstruido desde snapshots y deltas."""
+    job = job_manager.get(job_id)
+    if job is None or job.simulator is None:
+        return jsonify({'error': 'Trabajo inexistente o sin iniciar'}), 404
+    try:
+        return jsonify(job.simulator.recorder.state_at(cycle))
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela un trabajo en cola o en ejecución."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo inexistente'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/runs/<run_id>/prices', methods=['GET'])
+def run_prices(run_id):
+    """
+    Precios de una corrida guardada en el rango [from, to), reducidos a lo sumo a max_points puntos
+    (method=minmax o lttb) para graficar; el costo no depende del largo del rango.
+    """
+    series = series_store.get(run_id)
+    if series is None:
+        return jsonify({'error': 'Corrida inexistente'}), 404
+    return jsonify(series.range(request.args.get('from', 0, type=int),
+                                request.args.get('to', None, type=int),
+                                request.args.get('max_points', 1000, type=int),
+                                request.args.get('method', 'minmax')))
+
+@app.route('/api/metrics')
+def metrics():
+    """Métricas acumuladas de las corridas instrumentadas ("profile": true), en formato Prometheus."""
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Límites de un barrido pedido por la web (corre en el handler del request)
+MAX_SWEEP_PATHS = 10_000
+MAX_SWEEP_RUNS = 100_000
+MAX_SWEEP_CYCLES = 5000  # igual que el formulario
+MAX_SWEEP_TICKS = 20_000_000  # ticks simulados en todo el barrido
+
+@app.route('/api/sweep', methods=['POST'])
+def sweep():
+    """
+    Endpoint de barrido Monte Carlo: corre `paths` simulaciones con semilla por escenario
+    de la grilla y devuelve distribuciones agregadas (precio final, PnL por inversor y transacciones).
+    """
+    data = request.json
+    initial_prices = data.get('initial_prices', [data.get('initial_price', 100.0)])
+    cycles = data.get('cycles', [8])
+    risk_mixes = data.get('risk_mixes', [list(DEFAULT_RISK_MIX)])
+    paths = int(data.get('paths', 100))
+    if paths > MAX_SWEEP_PATHS:
+        raise ValueError(f"paths no puede superar {MAX_SWEEP_PATHS}")
+    cycles = [int(n_cycles) for n_cycles in cycles]
+    if any(n_cycles < 1 or n_cycles > MAX_SWEEP_CYCLES for n_cycles in cycles):
+        raise ValueError(f"Cada valor de cycles debe estar entre 1 y {MAX_SWEEP_CYCLES}")
+    scenarios_per_cycles = paths * len(initial_prices) * len(risk_mixes)
+    if scenarios_per_cycles * len(cycles) > MAX_SWEEP_RUNS:
+        raise ValueError(f"El barrido no puede superar {MAX_SWEEP_RUNS} corridas en total")
+    if scenarios_per_cycles * sum(cycles) > MAX_SWEEP_TICKS:
+        raise ValueError(f"El barrido no puede superar {MAX_SWEEP_TICKS} ticks simulados en total")
+    processes = data.get('processes')
+    if processes is not None:
+        processes = min(int(processes), os.cpu_count() or 1)  # no más procesos que núcleos
+    result = run_sweep(initial_prices=initial_prices,
+                       cycles=cycles,
+                       risk_mixes=risk_mixes,
+                       paths=paths,
+                       seed=data.get('seed', 0),
+                       processes=processes)
     return jsonify(result)
 
 if __name__ == '__main__':
@@ -0,0 +1,4 @@
+"""
+    Benchmarks del simulador. Se ejecutan desde la raíz del proyecto, por ejemplo:
+    python -m benchmarks.bench_dispatcher
+"""
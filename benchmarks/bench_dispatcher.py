@@ -0,0 +1,125 @@
+# benchmarks/bench_dispatcher.py
+"""
+    Compara el despacho con tabla de ruteo precalculada contra el despacho original
+    (copia de la cola + import e isinstance por cada entrega).
+
+    Uso: python -m benchmarks.bench_dispatcher [--messages N] [--investors M]
+"""
+
+import argparse
+import time
+from collections import deque
+
+from agents import MarketAgent, InvestorAgent
+from events import MarketEvent, FipaPerformative
+from message_dispatcher import MessageDispatcher
+
+
+class SinkMarket(MarketAgent):
+    """Mercado que no responde: mide solo el costo del despacho."""
+
+    def process_cfp(self, event):
+        pass
+
+    def process_accept(self, event):
+        pass
+
+
+class SinkInvestor(InvestorAgent):
+    """Inversor que no responde: mide solo el costo del despacho."""
+
+    def handle_propose(self, event):
+        pass
+
+    def handle_inform(self, event):
+        pass
+
+
+def legacy_deliver(agent, event):
+    """Entrega tal como lo hacía MessageDispatcher._deliver_to_agent antes de la tabla de ruteo."""
+    from agents import MarketAgent, InvestorAgent
+
+    if isinstance(agent, MarketAgent):
+        if event.performative == FipaPerformative.CFP:
+            agent.process_cfp(event)
+        elif event.performative == FipaPerformative.ACCEPT_PROPOSAL:
+            agent.process_accept(event)
+        else:
+            agent.comms.receive_event(event)
+    elif isinstance(agent, InvestorAgent):
+        if event.performative == FipaPerformative.PROPOSE:
+            agent.handle_propose(event)
+        elif event.performative == FipaPerformative.INFORM:
+            agent.handle_inform(event)
+        else:
+            agent.comms.receive_event(event)
+    else:
+        agent.comms.receive_event(event)
+
+
+def legacy_dispatch(dispatcher, max_iterations=10):
+    """Bucle de despacho original: copia la cola en una lista en cada pasada."""
+    processed = 0
+    iterations = 0
+    while dispatcher.message_queue and iterations < max_iterations:
+        current_batch = list(dispatcher.message_queue)
+        dispatcher.message_queue.clear()
+        for event in current_batch:
+            target_agent = dispatcher.agents.get(event.receiver)
+            if target_agent:
+                legacy_deliver(target_agent, event)
+                processed += 1
+            else:
+                dispatcher.message_queue.append(event)
+        iterations += 1
+    return processed
+
+
+def build(messages, investors):
+    dispatcher = MessageDispatcher(history_size=0)
+    market = SinkMarket("Mercado01")
+    dispatcher.register_agent(market.id, market)
+    ids = [f"Inversor_{i}" for i in range(investors)]
+    for agent_id in ids:
+        dispatcher.register_agent(agent_id, SinkInvestor(agent_id, risk_tolerance=0.3))
+
+    # Mezcla típica de un tick del CNP: CFP, PROPOSE, ACCEPT_PROPOSAL, INFORM
+    events = []
+    for i in range(messages // 4):
+        investor = ids[i % investors]
+        events.append(MarketEvent(investor, market.id, FipaPerformative.CFP, {"type": "buy", "amount": 1.0}))
+        events.append(MarketEvent(market.id, investor, FipaPerformative.PROPOSE, {"price": 100.0}))
+        events.append(MarketEvent(investor, market.id, FipaPerformative.ACCEPT_PROPOSAL, {"price": 100.0, "type": "buy"}))
+        events.append(MarketEvent(market.id, investor, FipaPerformative.INFORM, {"status": "success", "price": 100.0}))
+    return dispatcher, events
+
+
+def measure(dispatch, messages, investors, repeat=3):
+    """Mejor tiempo de `repeat` corridas, en mensajes por segundo."""
+    best = float('inf')
+    for _ in range(repeat):
+        dispatcher, events = build(messages, investors)
+        dispatcher.message_queue = deque(events)
+        start = time.perf_counter()
+        processed = dispatch(dispatcher)
+        best = min(best, time.perf_counter() - start)
+        assert processed == len(events)
+    return len(events) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--investors', type=int, default=1000)
+    args = parser.parse_args()
+
+    legacy = measure(legacy_dispatch, args.messages, args.investors)
+    routed = measure(lambda dispatcher: dispatcher.dispatch(), args.messages, args.investors)
+
+    print(f"Despacho original:      {legacy:>12,.0f} mensajes/s")
+    print(f"Tabla de ruteo:         {routed:>12,.0f} mensajes/s")
+    print(f"Mejora:                 {routed / legacy:>12.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/suite.py
+"""
+    Suite de benchmarks de la simulación completa: corre WebBoot sin la web con distintas cantidades
+    de inversores y de ciclos, y mide ticks/s, mensajes despachados/s, RSS pico, bytes por agente y
+    latencia por fase. Cada escenario corre en un proceso nuevo para que el RSS pico sea el suyo.
+
+    Hasta --max-agents inversores se usan InvestorAgent individuales; por encima, una
+    InvestorPopulation vectorizada con esa cantidad de inversores.
+
+    Uso:
+        python -m benchmarks.suite run [--investors 10,1000,100000,1000000] [--cycles 10,100]
+                                       [--output baseline.json] [--compare baseline.json]
+        python -m benchmarks.suite compare baseline.json actual.json [--threshold 0.1]
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+DEFAULT_INVESTORS = (10, 1000, 100_000, 1_000_000)
+DEFAULT_CYCLES = (10, 100)
+DEFAULT_THRESHOLD = 0.10
+
+# Métricas comparadas: True si más alto es mejor
+HIGHER_IS_BETTER = {
+    'ticks_per_sec': True,
+    'messages_per_sec': True,
+    'peak_rss_bytes': False,
+    'bytes_per_agent': False,
+    'tick_p50_ms': False,
+    'tick_p95_ms': False,
+}
+
+
+def run_scenario(investors: int, cycles: int, max_agents: int, seed: int, batch_cnp: bool = False) -> dict:
+    """Corre un escenario y retorna sus métricas. Se ejecuta en un proceso aparte."""
+    from simulation import WebBoot
+
+    individual = investors <= max_agents
+    simulator = WebBoot(profile=True)
+    simulator.dispatcher.message_history = None  # el historial de depuración no es parte de lo medido
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        if individual:
+            simulator.initialize_agents(seed=seed, risk_mix=[(0.1, 0.6, 0.3)[i % 3] for i in range(investors)],
+                                        batch_cnp=batch_cnp)
+        else:
+            simulator.initialize_agents(seed=seed, risk_mix=[], population_size=investors, batch_cnp=batch_cnp)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tick_seconds = []
+        started = time.perf_counter()
+        last = started
+        for _ in simulator.iter_simulation(cycles):
+            now = time.perf_counter()
+            tick_seconds.append(now - last)
+            last = now
+        elapsed = time.perf_counter() - started
+
+    profile = simulator.profiler.to_dict()
+    messages = sum(profile['messages'].values())
+    dispatch_seconds = profile['phase_seconds']['dispatch']
+    tick_seconds.sort()
+    return {
+        'investors': investors,
+        'cycles': cycles,
+        'mode': 'agents' if individual else 'population',
+        'seconds': elapsed,
+        'ticks_per_sec': cycles / elapsed if elapsed else 0.0,
+        'messages': messages,
+        # Throughput del despacho: mensajes sobre el tiempo de la fase de despacho
+        'messages_per_sec': messages / dispatch_seconds if dispatch_seconds else 0.0,
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'bytes_per_agent': traced_peak / investors,
+        'tick_p50_ms': _percentile(tick_seconds, 0.50) * 1000,
+        'tick_p95_ms': _percentile(tick_seconds, 0.95) * 1000,
+        'phase_ms_per_tick': {phase: seconds * 1000
+                              for phase, seconds in profile['phase_seconds_per_tick'].items()},
+    }
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(investors=DEFAULT_INVESTORS, cycles=DEFAULT_CYCLES, max_agents=1000, seed=0, repeat=1,
+              batch_cnp=False) -> dict:
+    """Corre todos los escenarios (cada uno en un proceso nuevo) y arma el resultado."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for n_investors in investors:
+        for n_cycles in cycles:
+            runs = []
+            for _ in range(repeat):
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(run_scenario, (n_investors, n_cycles, max_agents, seed, batch_cnp)))
+            best = max(runs, key=lambda run: run['ticks_per_sec'])
+            results.append(best)
+            print(format_result(best), file=sys.stderr)
+
+    return {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'batch_cnp': batch_cnp,
+        'results': results,
+    }
+
+
+def format_result(result: dict) -> str:
+    phases = ' '.join(f"{phase}={ms:.2f}" for phase, ms in result['phase_ms_per_tick'].items())
+    return (f"{result['investors']:>9,} inversores x {result['cycles']:>5} ciclos ({result['mode']}): "
+            f"{result['ticks_per_sec']:>9.1f} ticks/s  {result['messages_per_sec']:>11,.0f} msg/s  "
+            f"RSS {result['peak_rss_bytes'] / 2**20:>7.1f} MiB  {result['bytes_per_agent']:>8.1f} B/agente  "
+            f"ms/tick [{phases}]")
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compara dos resultados escenario por escenario.
+    Retorna las regresiones: métricas que empeoraron más que `threshold` (fracción) respecto de la base.
+    """
+    base_by_key = {(r['investors'], r['cycles']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = base_by_key.get((result['investors'], result['cycles']))
+        if base is None:
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append({'investors': result['investors'], 'cycles': result['cycles'],
+                                    'metric': metric, 'baseline': old, 'current': new, 'change': change})
+    return regressions
+
+
+def report_regressions(regressions: list) -> int:
+    """Imprime las regresiones y retorna el código de salida (1 si hay alguna)."""
+    if not regressions:
+        print("Sin regresiones.")
+        return 0
+    for r in regressions:
+        print(f"REGRESIÓN {r['investors']:,} x {r['cycles']}: {r['metric']} "
+              f"{r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%})")
+    return 1
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='corre la suite')
+    run.add_argument('--investors', type=_int_list, default=list(DEFAULT_INVESTORS))
+    run.add_argument('--cycles', type=_int_list, default=list(DEFAULT_CYCLES))
+    run.add_argument('--max-agents', type=int, default=1000,
+                     help='hasta esta cantidad se usan agentes individuales; por encima, una población')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--repeat', type=int, default=1, help='corridas por escenario (se queda con la mejor)')
+    run.add_argument('--batch-cnp', action='store_true', help='mercado con rondas del Contract Net en lote')
+    run.add_argument('--output', help='archivo JSON donde guardar los resultados')
+    run.add_argument('--compare', metavar='BASELINE', help='compara contra un resultado guardado')
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    cmp = commands.add_parser('compare', help='compara dos resultados guardados')
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        sys.exit(report_regressions(compare(baseline, current, args.threshold)))
+
+    current = run_suite(args.investors, args.cycles, args.max_agents, args.seed, args.repeat, args.batch_cnp)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(report_regressions(compare(baseline, current, args.threshold)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from events import MarketEvent
 from message_dispatcher import get_dispatcher
+from tracing import TRACER, TRACE, SEND, RECEIVE
 
 class CommunicativeCapacity:
     """Capacidad para enviar y recibir eventos/mensajes."""
@@ -18,6 +19,10 @@ class CommunicativeCapacity:
         """Permite inyectar un dispatcher personalizado."""
         self._dispatcher = dispatcher
 
+    def create_event(self, sender: str, receiver: str, performative, content: dict) -> MarketEvent:
+        """Crea un evento a través del dispatcher (que puede reutilizar eventos de su pool)."""
+        return self._get_dispatcher().create_event(sender, receiver, performative, content)
+
     def send_event(self, event: MarketEvent):
         """
         Envía un evento al MessageDispatcher para su procesamiento.
@@ -32,12 +37,13 @@ class CommunicativeCapacity:
         dispatcher = self._get_dispatcher()
         dispatcher.send_event(event)
 
-        # Opcional: mantener el print para debugging (se puede comentar)
-        print(f"ENVIADO: {event}")
+        if TRACER.level <= TRACE:
+            TRACER.emit(SEND, event.sender, event.receiver, event.performative.value)
 
     def receive_event(self, event):
         """El agente procesa un evento entrante."""
-        print(f"RECIBIDO por {self.id}: {event}")
+        if TRACER.level <= TRACE:
+            TRACER.emit(RECEIVE, event.receiver, event.sender, event.performative.value)
         # Lógica de manejo de performative FIPA
         if event.performative == event.performative.PROPOSE:
             self.handle_propose(event)
@@ -0,0 +1,105 @@
+# checkpoint.py
+"""
+    Checkpoints binarios de una simulación completa: mercado (con su generador aleatorio y libro
+    de órdenes), inversores, poblaciones, acciones pendientes y cola del dispatcher.
+    Reanudar desde un checkpoint produce exactamente los mismos resultados que la corrida original.
+"""
+
+import os
+import pickle
+
+from agents import MarketAgent, BatchMarketAgent, InvestorAgent
+from population import InvestorPopulation
+
+CHECKPOINT_MAGIC = b'SIMCKPT1'
+
+# Tipos de agente que se pueden guardar, con la clave usada en el checkpoint
+_AGENT_KINDS = {
+    'investor': InvestorAgent,
+    'population': InvestorPopulation,
+}
+
+_MARKET_KINDS = {
+    'market': MarketAgent,
+    'batch_market': BatchMarketAgent,
+}
+
+
+def capture_state(boot, include_data: bool = True) -> dict:
+    """Arma el estado completo de un WebBoot. Con include_data se guardan también los datos ya capturados."""
+    agents = []
+    for agent in boot.agents.values():
+        if agent is boot.market:
+            continue
+        kind = next((kind for kind, cls in _AGENT_KINDS.items() if type(agent) is cls), None)
+        if kind is None:
+            raise ValueError(f"El agente {agent.id} ({type(agent).__name__}) no soporta checkpoints")
+        agents.append((kind, agent.get_state()))
+
+    return {
+        'current_cycle': boot.current_cycle,
+        'market_kind': next(kind for kind, cls in _MARKET_KINDS.items() if type(boot.market) is cls),
+        'market': boot.market.get_state(),
+        'agents': agents,
+        'queue': boot.dispatcher.get_state(),
+        'statistics': boot.stats,
+        'recorder': (boot.recorder, boot._changed_agents),
+        'simulation_data': boot.simulation_data if include_data else None,
+    }
+
+
+def restore_state(state: dict):
+    """Reconstruye un WebBoot listo para continuar con resume_simulation."""
+    from simulation import WebBoot
+
+    boot = WebBoot()
+    boot.market = _MARKET_KINDS[state.get('market_kind', 'market')].from_state(state['market'])
+    boot.agents[boot.market.id] = boot.market
+    boot.dispatcher.register_agent(boot.market.id, boot.market)
+
+    for kind, agent_state in state['agents']:
+        agent = _AGENT_KINDS[kind].from_state(agent_state)
+        boot.agents[agent.id] = agent
+        boot.dispatcher.register_agent(agent.id, agent)
+
+    for agent in boot.agents.values():
+        agent.comms.set_dispatcher(boot.dispatcher)
+        if isinstance(agent, InvestorAgent):
+            agent.attach_indicators(boot.market.indicators)
+
+    boot.dispatcher.set_state(state['queue'])
+    boot.current_cycle = state['current_cycle']
+    boot.stats = state['statistics']
+    boot.recorder, boot._changed_agents = state['recorder']
+    if state['simulation_data'] is not None:
+        boot.simulation_data = state['simulation_data']
+    return boot
+
+
+def dumps_checkpoint(boot, include_data: bool = True) -> bytes:
+    """El checkpoint en memoria, con el mismo formato que save_checkpoint."""
+    return CHECKPOINT_MAGIC + pickle.dumps(capture_state(boot, include_data), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads_checkpoint(data: bytes):
+    """Reconstruye un WebBoot desde los bytes de dumps_checkpoint."""
+    if not data.startswith(CHECKPOINT_MAGIC):
+        raise ValueError("Los datos no son un checkpoint de simulación")
+    return restore_state(pickle.loads(memoryview(data)[len(CHECKPOINT_MAGIC):]))
+
+
+def save_checkpoint(boot, path: str, include_data: bool = True):
+    """Guarda el checkpoint en binario (escritura atómica: nunca deja un archivo a medio escribir)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(CHECKPOINT_MAGIC)
+        pickle.dump(capture_state(boot, include_data), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str):
+    """Carga un checkpoint guardado con save_checkpoint y retorna el WebBoot reconstruido."""
+    with open(path, 'rb') as f:
+        if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} no es un checkpoint de simulación")
+        return restore_state(pickle.load(f))
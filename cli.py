@@ -0,0 +1,180 @@
+# cli.py
+"""
+    Modo batch: corre escenarios sin la web a partir de un archivo de configuración y escribe los
+    resultados en disco. Pensado para trabajos que lanzan muchas corridas cortas, así que solo se
+    importa lo que la corrida usa: Flask nunca, numpy solo con poblaciones, modelos de precio,
+    mercados múltiples o el formato columnar.
+
+    La configuración es JSON con las mismas claves que el cuerpo de /api/simulate (seed, cycles,
+    initial_price, population_size, order_book, batch_cnp, price_model, snapshot_every,
+    sample_every, profile), o las de /api/markets/simulate si tiene "markets". Un archivo con una
+    lista de escenarios corre uno tras otro y --output es un directorio (un archivo por escenario,
+    nombrado por su clave "name" o por su posición).
+
+    Formatos de salida:
+        json      el resultado completo, igual que /api/simulate
+        ndjson    un registro por ciclo a medida que se calcula y un resumen al final
+        columnar  el formato binario de columnar.py (solo un mercado)
+
+    Uso:
+        python -m cli run escenario.json --output resultado.json [--format json|ndjson|columnar]
+                                         [--cycles N] [--trace-level debug] [--trace-file corrida.trace]
+        python -m cli run escenarios.json --output resultados/ --format ndjson
+"""
+
+import json
+import os
+import sys
+
+from simulation import create_simulator, scenario_params
+from tracing import TRACER, configure_from_env
+
+FORMATS = {'json': '.json', 'ndjson': '.ndjson', 'columnar': '.simc'}
+DEFAULT_CYCLES = 8
+
+_SCENARIO_KEYS = frozenset(scenario_params({})) | {'name', 'cycles'}
+_MARKETS_KEYS = frozenset(('name', 'cycles', 'markets', 'seed', 'workers', 'sync_every',
+                           'snapshot_every', 'sample_every'))
+
+
+def load_config(path: str) -> list:
+    """Escenarios del archivo de configuración (siempre una lista)."""
+    with open(path) as f:
+        config = json.load(f)
+    scenarios = config if isinstance(config, list) else [config]
+    if not scenarios or not all(isinstance(scenario, dict) for scenario in scenarios):
+        raise ValueError("La configuración debe ser un escenario (objeto JSON) o una lista de escenarios")
+    return scenarios
+
+
+def check_scenario(scenario: dict, output_format: str = 'json'):
+    """Valida las claves de un escenario y el formato de salida antes de correr nada."""
+    if output_format not in FORMATS:
+        raise ValueError(f"Formato desconocido: {output_format!r} (opciones: {', '.join(FORMATS)})")
+    if 'markets' in scenario:
+        from markets import MARKET_PARAMS
+        unknown = set(scenario) - _MARKETS_KEYS - set(MARKET_PARAMS)
+        if output_format == 'columnar':
+            raise ValueError("El formato columnar no admite varios mercados")
+    else:
+        unknown = set(scenario) - _SCENARIO_KEYS
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+
+
+def run_scenario(scenario: dict, output, output_format: str = 'json', cycles: int = None):
+    """Corre un escenario y escribe el resultado en `output` (archivo binario abierto)."""
+    check_scenario(scenario, output_format)
+    cycles = cycles if cycles is not None else scenario.get('cycles', DEFAULT_CYCLES)
+    if 'markets' in scenario:
+        _run_markets(scenario, output, output_format, cycles)
+    else:
+        _run_single(scenario, output, output_format, cycles)
+
+
+def _run_single(scenario, output, output_format, cycles):
+    # En ndjson cada registro se escribe y se descarta: sin historial de estados en memoria
+    simulator = create_simulator(scenario, keep_history=output_format != 'ndjson')
+
+    if output_format == 'ndjson':
+        for record in simulator.iter_simulation(cycles):
+            record['type'] = 'cycle'
+            _write_line(output, record)
+        summary = {'type': 'summary', 'agent_state': simulator.current_state()}
+        if simulator.stats.ticks:
+            summary['statistics'] = simulator.stats.summary()
+        if simulator.profiler is not None:
+            summary['profile'] = simulator.profiler.to_dict()
+        _write_line(output, summary)
+        return
+
+    result = dict(simulator.run_simulation(cycles=cycles))
+    if result['price_history']:
+        result['statistics'] = simulator.stats.summary()
+    if simulator.profiler is not None:
+        result['profile'] = simulator.profiler.to_dict()
+    if output_format == 'columnar':
+        from columnar import encode_result
+        output.write(encode_result(result, result.get('statistics'), result.get('profile')))
+    else:
+        output.write(json.dumps(result).encode('utf-8'))
+
+
+def _run_markets(scenario, output, output_format, cycles):
+    from markets import MultiMarketBoot, MARKET_PARAMS
+
+    boot = MultiMarketBoot(scenario['markets'], seed=scenario.get('seed'), workers=scenario.get('workers'),
+                           sync_every=scenario.get('sync_every', 1),
+                           snapshot_every=scenario.get('snapshot_every', 50),
+                           sample_every=scenario.get('sample_every', 1),
+                           keep_history=output_format != 'ndjson',
+                           **{key: scenario[key] for key in MARKET_PARAMS if key in scenario})
+
+    if output_format == 'ndjson':
+        for record in boot.iter_simulation(cycles):
+            record['type'] = 'cycle'
+            _write_line(output, record)
+        _write_line(output, {'type': 'summary', 'portfolios': boot.portfolios(),
+                             'statistics': {market_id: data['statistics'] for market_id, data in boot.result.items()}})
+    else:
+        output.write(json.dumps(boot.run_simulation(cycles)).encode('utf-8'))
+
+
+def _write_line(output, record):
+    output.write(json.dumps(record).encode('utf-8') + b'\n')
+
+
+def _output_paths(scenarios, output, output_format):
+    """Un archivo por escenario: `output` con un escenario, `output`/<nombre><extensión> con varios."""
+    if len(scenarios) == 1 and not output.endswith(os.sep):
+        return [output]
+    os.makedirs(output, exist_ok=True)
+    names = [scenario.get('name') or f"run_{i:03d}" for i, scenario in enumerate(scenarios)]
+    if len(set(names)) != len(names):
+        raise ValueError("Los nombres de los escenarios deben ser únicos")
+    return [os.path.join(output, f"{name}{FORMATS[output_format]}") for name in names]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='corre los escenarios de un archivo de configuración')
+    run.add_argument('config', help='archivo JSON con un escenario o una lista de escenarios')
+    run.add_argument('--output', '-o', default='-',
+                     help='archivo de salida ("-" es stdout); con varios escenarios, un directorio')
+    run.add_argument('--format', '-f', choices=FORMATS, default='json')
+    run.add_argument('--cycles', type=int, help='reemplaza la cantidad de ciclos de la configuración')
+    run.add_argument('--trace-level', help='nivel de traza (trace, debug, info, warning, off)')
+    run.add_argument('--trace-file', help='archivo de traza binario (ver tracing.py); sin él, texto por stderr')
+
+    args = parser.parse_args(argv)
+    try:
+        scenarios = load_config(args.config)
+        for scenario in scenarios:
+            check_scenario(scenario, args.format)
+        if args.trace_level or args.trace_file:
+            from tracing import FileSink, PrintSink
+            TRACER.configure(args.trace_level or 'debug',
+                             FileSink(args.trace_file) if args.trace_file else PrintSink(sys.stderr))
+        else:
+            configure_from_env()
+
+        if args.output == '-':
+            if len(scenarios) > 1:
+                raise ValueError("Con varios escenarios --output debe ser un directorio")
+            run_scenario(scenarios[0], sys.stdout.buffer, args.format, args.cycles)
+            sys.stdout.buffer.flush()
+            return
+        for scenario, path in zip(scenarios, _output_paths(scenarios, args.output, args.format)):
+            with open(path, 'wb') as f:
+                run_scenario(scenario, f, args.format, args.cycles)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"error: {e}\n")
+    finally:
+        TRACER.flush()
+
+
+if __name__ == '__main__':
+    main()
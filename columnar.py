@@ -0,0 +1,154 @@
+# columnar.py
+"""
+    Formato binario columnar para los resultados de una simulación: los precios, las transacciones
+    y los estados de los agentes viajan como arreglos empaquetados (little-endian) y los ids de
+    agentes y las acciones se codifican con un diccionario. El frontend los lee directamente como
+    typed arrays, sin parsear JSON por cada ciclo.
+
+    Estructura:
+        'SIMC' | versión (uint16) | reservado (uint16) | largo del encabezado (uint32) | encabezado JSON
+        | relleno hasta múltiplo de 8 | columnas (cada una alineada a 8 bytes)
+
+    El encabezado trae los diccionarios, las estadísticas y, por columna, [dtype, offset, largo].
+"""
+
+import json
+import struct
+
+import numpy as np
+
+COLUMNAR_MIMETYPE = 'application/vnd.simulador.columnar'
+MAGIC = b'SIMC'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sHHI')
+
+# dtype de numpy -> nombre del typed array en el frontend
+_DTYPES = {
+    'float64': '<f8',
+    'float32': '<f4',
+    'uint32': '<u4',
+    'uint16': '<u2',
+    'uint8': 'u1',
+}
+
+
+class _Dictionary:
+    """Codificación por diccionario: valor -> índice, en orden de aparición."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self._index = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def encode_result(result: dict, statistics: dict = None, profile: dict = None) -> bytes:
+    """
+    Codifica el resultado de WebBoot.run_simulation. `agent_states` debe ser el dict de StateRecorder
+    (snapshots y deltas): cada fila de estado es (ciclo, agente, saldo fiat, saldo cripto).
+    """
+    agents = _Dictionary()
+    actions = _Dictionary(('buy', 'sell'))
+    risk_tolerance = {}
+    populations = {}
+
+    # Estados: filas de snapshots y deltas, en orden de ciclo
+    states = result.get('agent_states') or {'snapshots': [], 'deltas': []}
+    entries = sorted([(state['cycle'], 0, state) for state in states['snapshots']] +
+                     [(delta['cycle'], 1, delta) for delta in states['deltas']], key=lambda entry: entry[:2])
+    state_cycle, state_agent, state_fiat, state_crypto = [], [], [], []
+    snapshot_cycles = []
+    for cycle, is_delta, state in entries:
+        if not is_delta:
+            snapshot_cycles.append(cycle)
+        for agent_id, info in state['investors'].items():
+            risk_tolerance[agent_id] = info['risk_tolerance']
+            state_cycle.append(cycle)
+            state_agent.append(agents.code(agent_id))
+            state_fiat.append(info['fiat_balance'])
+            state_crypto.append(info['crypto_balance'])
+        for population_id, summary in state.get('populations', {}).items():
+            populations[population_id] = {'size': summary['size'],
+                                          'mean_risk_tolerance': summary['mean_risk_tolerance']}
+            state_cycle.append(cycle)
+            state_agent.append(agents.code(population_id))
+            state_fiat.append(summary['fiat_balance'])
+            state_crypto.append(summary['crypto_balance'])
+
+    transactions = result.get('transactions', [])
+    tx_sender = [agents.code(t['sender']) for t in transactions]
+    tx_receiver = [agents.code(t['receiver']) for t in transactions]
+    # Los índices de diccionario usan el entero más chico que alcanza
+    agent_dtype = _index_dtype(len(agents.values))
+    columns = {
+        'price_history': np.asarray(result.get('price_history', []), dtype='<f8'),
+        'tx_cycle': np.fromiter((t['cycle'] for t in transactions), dtype='<u4', count=len(transactions)),
+        'tx_sender': np.asarray(tx_sender, dtype=agent_dtype),
+        'tx_receiver': np.asarray(tx_receiver, dtype=agent_dtype),
+        'tx_action': np.fromiter((actions.code(t['action']) for t in transactions), dtype='u1', count=len(transactions)),
+        'tx_price': np.fromiter((t['price'] for t in transactions), dtype='<f8', count=len(transactions)),
+        'tx_count': np.fromiter((t['count'] for t in transactions), dtype='<f4', count=len(transactions)),
+        'state_cycle': np.asarray(state_cycle, dtype='<u4'),
+        'state_agent': np.asarray(state_agent, dtype=agent_dtype),
+        'state_fiat': np.asarray(state_fiat, dtype='<f8'),
+        'state_crypto': np.asarray(state_crypto, dtype='<f8'),
+        'snapshot_cycles': np.asarray(snapshot_cycles, dtype='<u4'),
+    }
+
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        dtype = next(key for key, code in _DTYPES.items() if np.dtype(code) == array.dtype)
+        layout[name] = [dtype, offset, int(array.size)]
+        offset += _aligned(array.nbytes)
+
+    header = json.dumps({
+        'run_id': result.get('run_id'),
+        'agents': agents.values,
+        'actions': actions.values,
+        'risk_tolerance': risk_tolerance,
+        'populations': populations,
+        'snapshot_every': states.get('snapshot_every'),
+        'sample_every': states.get('sample_every'),
+        'statistics': statistics,
+        'profile': profile,
+        'columns': layout,
+    }).encode('utf-8')
+
+    body_start = _aligned(_PREAMBLE.size + len(header))
+    out = bytearray(body_start + offset)
+    _PREAMBLE.pack_into(out, 0, MAGIC, VERSION, 0, len(header))
+    out[_PREAMBLE.size:_PREAMBLE.size + len(header)] = header
+    for name, array in columns.items():
+        start = body_start + layout[name][1]
+        out[start:start + array.nbytes] = array.tobytes()
+    return bytes(out)
+
+
+def decode_result(data: bytes) -> dict:
+    """Decodifica un resultado columnar: retorna el encabezado y las columnas como arreglos de numpy."""
+    magic, version, _, header_size = _PREAMBLE.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("No es un resultado columnar de simulación compatible")
+    header = json.loads(data[_PREAMBLE.size:_PREAMBLE.size + header_size].decode('utf-8'))
+    body_start = _aligned(_PREAMBLE.size + header_size)
+    columns = {name: np.frombuffer(data, dtype=_DTYPES[dtype], count=length, offset=body_start + offset)
+               for name, (dtype, offset, length) in header['columns'].items()}
+    return {'header': header, 'columns': columns}
+
+
+def _index_dtype(size: int) -> str:
+    if size <= 0x100:
+        return 'u1'
+    return '<u2' if size <= 0x10000 else '<u4'
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
@@ -16,13 +16,115 @@ class TransactionType(Enum):
     BUY = "buy"
     SELL = "sell"
 
+# Esquema fijo de contenido por performative (claves en orden de almacenamiento)
+CONTENT_SCHEMAS = {
+    FipaPerformative.CFP: ("request", "type", "amount", "count"),
+    FipaPerformative.PROPOSE: ("price", "best_buy", "best_sell", "type"),
+    FipaPerformative.ACCEPT_PROPOSAL: ("price", "type", "limit", "count"),
+    FipaPerformative.REJECT_PROPOSAL: ("price", "type", "reason"),
+    FipaPerformative.INFORM: ("status", "price", "action", "count", "fills"),
+    FipaPerformative.FAILURE: ("reason",),
+}
+
+_SCHEMA_INDEX = {performative: {key: i for i, key in enumerate(keys)}
+                 for performative, keys in CONTENT_SCHEMAS.items()}
+
+_MISSING = object()
+
+
+class EventContent:
+    """
+    Contenido compacto de un evento: guarda solo los valores, en el orden del esquema del performative.
+    Se usa como un dict de solo lectura (get, [], in, items).
+    """
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index: dict, values: tuple):
+        self._index = index
+        self._values = values
+
+    @classmethod
+    def from_dict(cls, performative: FipaPerformative, content: dict):
+        """Retorna un EventContent si el dict respeta el esquema, o None si trae claves libres."""
+        index = _SCHEMA_INDEX[performative]
+        if any(key not in index for key in content):
+            return None
+        return cls(index, tuple(content.get(key, _MISSING) for key in CONTENT_SCHEMAS[performative]))
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        if i is None:
+            return default
+        value = self._values[i]
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def items(self):
+        return [(key, self._values[i]) for key, i in self._index.items() if self._values[i] is not _MISSING]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, EventContent):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
 class MarketEvent:
     """Clase para simular un mensaje/evento entre agentes."""
-    def __init__(self, sender: str, receiver: str, performative: FipaPerformative, content: dict):
+    __slots__ = ('sender', 'receiver', 'performative', 'content', 'ttl')
+
+    def __init__(self, sender: str, receiver: str, performative: FipaPerformative, content: dict, ttl: int = None):
+        self._reset(sender, receiver, performative, content, ttl)
+
+    def _reset(self, sender: str, receiver: str, performative: FipaPerformative, content: dict, ttl: int = None):
         self.sender = sender
         self.receiver = receiver
         self.performative = performative
+        self.ttl = ttl  # despachos que puede esperar si el receptor no existe (None: el valor del dispatcher)
+        if isinstance(content, dict):
+            # Si el contenido no respeta el esquema se conserva el dict libre
+            content = EventContent.from_dict(performative, content) or content
         self.content = content
 
     def __str__(self):
-        return f"[{self.sender} -> {self.receiver}] {self.performative.value}: {self.content}"
\ No newline at end of file
+        return f"[{self.sender} -> {self.receiver}] {self.performative.value}: {self.content}"
+
+
+class EventPool:
+    """Pool opcional de MarketEvent para reutilizar instancias en lugar de crear una por mensaje."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._free = []
+
+    def acquire(self, sender: str, receiver: str, performative: FipaPerformative, content: dict) -> MarketEvent:
+        if self._free:
+            event = self._free.pop()
+            event._reset(sender, receiver, performative, content)
+            return event
+        return MarketEvent(sender, receiver, performative, content)
+
+    def release(self, event: MarketEvent):
+        """Devuelve un evento al pool. No debe quedar ninguna otra referencia al evento."""
+        if len(self._free) < self.max_size:
+            event.content = None
+            self._free.append(event)
+
+    def __len__(self):
+        return len(self._free)
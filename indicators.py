@@ -0,0 +1,273 @@
+# indicators.py
+"""
+    Indicadores técnicos compartidos: el MarketAgent los actualiza una sola vez por tick, en O(1)
+    sobre ventanas circulares, y todos los inversores leen el mismo valor. N inversores que usan el
+    mismo indicador cuestan una actualización, no N recorridos del historial de precios.
+"""
+
+import math
+
+
+class RingBuffer:
+    """Ventana circular de tamaño fijo."""
+    __slots__ = ('_values', '_size', '_start', 'count')
+
+    def __init__(self, size: int):
+        self._values = [0.0] * size
+        self._size = size
+        self._start = 0
+        self.count = 0
+
+    def push(self, value: float):
+        """Agrega un valor; retorna el que sale de la ventana (None si todavía no estaba llena)."""
+        if self.count < self._size:
+            self._values[(self._start + self.count) % self._size] = value
+            self.count += 1
+            return None
+        evicted = self._values[self._start]
+        self._values[self._start] = value
+        self._start = (self._start + 1) % self._size
+        return evicted
+
+    def replace_last(self, value: float) -> float:
+        """Reemplaza el último valor agregado y retorna el anterior."""
+        index = (self._start + self.count - 1) % self._size
+        previous = self._values[index]
+        self._values[index] = value
+        return previous
+
+    def full(self) -> bool:
+        return self.count == self._size
+
+
+class Indicator:
+    """
+    Base de los indicadores. `update` procesa el precio de un tick nuevo y `revise` corrige el último
+    (cuando el libro de órdenes reemplaza el precio de cierre). `value` es None hasta tener datos suficientes.
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("La ventana de un indicador debe ser mayor que 0")
+        self.window = window
+        self.value = None
+
+    def update(self, price: float):
+        raise NotImplementedError
+
+    def revise(self, price: float):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """Media móvil simple."""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self._prices = RingBuffer(window)
+        self._sum = 0.0
+
+    def update(self, price):
+        evicted = self._prices.push(price)
+        self._sum += price - (evicted or 0.0)
+        self._refresh()
+
+    def revise(self, price):
+        self._sum += price - self._prices.replace_last(price)
+        self._refresh()
+
+    def _refresh(self):
+        self.value = self._sum / self.window if self._prices.full() else None
+
+
+class EMA(Indicator):
+    """Media móvil exponencial (alpha = 2 / (window + 1)), arranca en el primer precio."""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.alpha = 2.0 / (window + 1)
+        self._previous = None  # valor antes del último precio (para revise)
+
+    def update(self, price):
+        self._previous = self.value
+        self._apply(price)
+
+    def revise(self, price):
+        self.value = self._previous
+        self._apply(price)
+
+    def _apply(self, price):
+        self.value = price if self.value is None else self.value + self.alpha * (price - self.value)
+
+
+class RSI(Indicator):
+    """Índice de fuerza relativa con el suavizado de Wilder."""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self._last_price = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._changes = 0
+        self._undo = None  # estado antes del último precio
+
+    def update(self, price):
+        self._undo = (self._last_price, self._avg_gain, self._avg_loss, self._changes)
+        self._apply(price)
+
+    def revise(self, price):
+        self._last_price, self._avg_gain, self._avg_loss, self._changes = self._undo
+        self._apply(price)
+
+    def _apply(self, price):
+        if self._last_price is not None:
+            change = price - self._last_price
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self._changes += 1
+            # Promedio simple hasta completar la ventana, después suavizado de Wilder
+            n = min(self._changes, self.window)
+            self._avg_gain += (gain - self._avg_gain) / n
+            self._avg_loss += (loss - self._avg_loss) / n
+        self._last_price = price
+        if self._changes < self.window:
+            self.value = None
+        elif self._avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+
+
+class RollingVolatility(Indicator):
+    """Desvío estándar de los retornos simples en la ventana."""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self._returns = RingBuffer(window)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._last_price = None
+        self._previous_price = None
+
+    def update(self, price):
+        if self._last_price is not None:
+            ret = price / self._last_price - 1
+            evicted = self._returns.push(ret)
+            if evicted is not None:
+                self._sum -= evicted
+                self._sum_sq -= evicted * evicted
+            self._sum += ret
+            self._sum_sq += ret * ret
+        self._previous_price = self._last_price
+        self._last_price = price
+        self._refresh()
+
+    def revise(self, price):
+        if self._previous_price is not None:
+            ret = price / self._previous_price - 1
+            old = self._returns.replace_last(ret)
+            self._sum += ret - old
+            self._sum_sq += ret * ret - old * old
+        self._last_price = price
+        self._refresh()
+
+    def _refresh(self):
+        if not self._returns.full():
+            self.value = None
+            return
+        mean = self._sum / self.window
+        self.value = math.sqrt(max(self._sum_sq / self.window - mean * mean, 0.0))
+
+
+class BollingerBands(Indicator):
+    """Bandas de Bollinger: (inferior, media, superior) a `k` desvíos de la media móvil."""
+
+    def __init__(self, window: int, k: float = 2.0):
+        super().__init__(window)
+        self.k = k
+        self._prices = RingBuffer(window)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def update(self, price):
+        evicted = self._prices.push(price)
+        if evicted is not None:
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+        self._sum += price
+        self._sum_sq += price * price
+        self._refresh()
+
+    def revise(self, price):
+        old = self._prices.replace_last(price)
+        self._sum += price - old
+        self._sum_sq += price * price - old * old
+        self._refresh()
+
+    def _refresh(self):
+        if not self._prices.full():
+            self.value = None
+            return
+        mean = self._sum / self.window
+        std = math.sqrt(max(self._sum_sq / self.window - mean * mean, 0.0))
+        self.value = (mean - self.k * std, mean, mean + self.k * std)
+
+
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'rsi': RSI,
+    'volatility': RollingVolatility,
+    'bollinger': BollingerBands,
+}
+
+
+class IndicatorService:
+    """
+    Indicadores registrados en un mercado, memoizados por (nombre, ventana, parámetros):
+    pedir dos veces el mismo indicador devuelve la misma instancia y se actualiza una sola vez.
+    Un indicador registrado a mitad de la corrida recorre una única vez el historial del mercado.
+    """
+
+    def __init__(self, history: list = None):
+        self._history = history if history is not None else []
+        self._indicators = {}
+
+    @staticmethod
+    def _key(name, window, params):
+        return (name, window) + tuple(sorted(params.items()))
+
+    def require(self, name: str, window: int, **params) -> Indicator:
+        """Registra (o retorna, si ya existe) un indicador."""
+        key = self._key(name, window, params)
+        indicator = self._indicators.get(key)
+        if indicator is None:
+            if name not in INDICATORS:
+                raise ValueError(f"Indicador desconocido: {name!r} (opciones: {', '.join(INDICATORS)})")
+            indicator = self._indicators[key] = INDICATORS[name](window, **params)
+            for price in self._history:
+                indicator.update(price)
+        return indicator
+
+    def require_all(self, specs):
+        """Registra los indicadores declarados por una habilidad: (nombre, ventana[, parámetros])."""
+        for spec in specs:
+            self.require(*spec[:2], **(spec[2] if len(spec) > 2 else {}))
+
+    def get(self, name: str, window: int, **params):
+        """Valor actual de un indicador registrado (None si todavía no tiene datos suficientes)."""
+        return self._indicators[self._key(name, window, params)].value
+
+    @property
+    def last_price(self):
+        return self._history[-1] if self._history else None
+
+    def update(self, price: float):
+        for indicator in self._indicators.values():
+            indicator.update(price)
+
+    def revise(self, price: float):
+        for indicator in self._indicators.values():
+            indicator.revise(price)
+
+    def __len__(self):
+        return len(self._indicators)
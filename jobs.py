@@ -0,0 +1,205 @@
+# jobs.py
+"""
+    Cola de trabajos de simulación asincrónicos: el request devuelve un id de trabajo, un pool
+    acotado de workers ejecuta las simulaciones y los clientes consultan el progreso, piden
+    resultados parciales o cancelan. Si la cola está llena se rechazan trabajos nuevos.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """La cola de trabajos alcanzó su capacidad máxima."""
+
+
+class Job:
+    """Un trabajo de simulación y su estado."""
+
+    def __init__(self, params: dict, cycles: int):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.cycles = cycles
+        self.status = QUEUED
+        self.progress = 0  # último ciclo completado
+        self.passed_over = 0  # veces que un trabajo llegado después corrió antes que este
+        self.simulator = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'cycle': self.progress,
+            'cycles': self.cycles,
+            'progress': self.progress / self.cycles if self.cycles else 1.0,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+    def result(self) -> dict:
+        """Resultados hasta el último ciclo completado (parciales si el trabajo sigue corriendo)."""
+        if self.simulator is None:
+            return {'job': self.to_dict()}
+        data = self.simulator.simulation_data
+        return {
+            'job': self.to_dict(),
+            'price_history': list(data['price_history']),
+            'agent_states': self.simulator.recorder.to_dict(),
+            'transactions': list(data['transactions']),
+            'statistics': self.simulator.stats.summary(),
+        }
+
+
+class JobManager:
+    """
+    Pool acotado de workers (hilos) con cola de prioridad: primero los trabajos más cortos.
+    Además, `short_workers` workers solo toman trabajos de hasta `short_cycles` ciclos, así las
+    corridas cortas nunca esperan detrás de las largas. Para que un flujo de trabajos cortos no
+    postergue a uno largo indefinidamente, un trabajo salteado `max_passed_over` veces pasa al
+    frente de la cola.
+    `on_done(job)` se llama, desde el worker, cuando un trabajo termina completo.
+    """
+
+    def __init__(self, create_simulator: Callable, workers: int = 4, short_workers: int = 1,
+                 short_cycles: int = 1000, max_queued: int = 64, max_finished: int = 256,
+                 max_passed_over: int = 8, on_done: Optional[Callable] = None):
+        self._create_simulator = create_simulator
+        self._on_done = on_done
+        self.short_cycles = short_cycles
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.max_passed_over = max_passed_over
+        self._jobs = OrderedDict()  # id -> Job
+        self._heap = []  # (prioridad, orden de llegada, job); prioridad = ciclos, o -1 si esperó demasiado
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = [threading.Thread(target=self._worker, args=(i < short_workers,), daemon=True,
+                                          name=f"simulation-worker-{i}")
+                         for i in range(max(workers, short_workers + 1))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, params: dict, cycles: int) -> Job:
+        """Encola un trabajo. Lanza JobQueueFull si ya hay max_queued trabajos esperando."""
+        with self._cond:
+            if len(self._heap) >= self.max_queued:
+                raise JobQueueFull(f"La cola de simulaciones está llena ({self.max_queued} trabajos)")
+            job = Job(params, cycles)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (cycles, next(self._order), job))
+            self._cond.notify_all()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela un trabajo: si está en cola no llega a correr, si está corriendo se detiene en el próximo ciclo."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.cancel_requested.set()
+            if job.status == QUEUED:
+                self._heap = [entry for entry in self._heap if entry[2] is not job]
+                heapq.heapify(self._heap)
+                self._finish(job, CANCELLED)
+            return job
+
+    def queued(self) -> int:
+        return len(self._heap)
+
+    def _next_job(self, short_only: bool) -> Job:
+        with self._cond:
+            while True:
+                entry = self._pick(short_only)
+                if entry is not None:
+                    self._take(entry, short_only)
+                    job = entry[2]
+                    job.status = RUNNING
+                    job.started_at = time.time()
+                    return job
+                self._cond.wait()
+
+    def _pick(self, short_only: bool):
+        """Próxima entrada de la cola que puede correr este worker (None si no hay)."""
+        if not self._heap:
+            return None
+        if not short_only or self._heap[0][2].cycles <= self.short_cycles:
+            return self._heap[0]
+        # El frente puede ser un trabajo largo adelantado: el worker reservado busca el corto siguiente
+        eligible = [entry for entry in self._heap if entry[2].cycles <= self.short_cycles]
+        return min(eligible) if eligible else None
+
+    def _take(self, entry, short_only: bool):
+        """
+        Saca `entry` de la cola y cuenta el salto a los trabajos anteriores que este worker podría
+        haber corrido; los que llegan a `max_passed_over` saltos pasan al frente (en orden de llegada).
+        """
+        remaining = []
+        for other in self._heap:
+            if other is entry:
+                continue
+            job = other[2]
+            if other[1] < entry[1] and (not short_only or job.cycles <= self.short_cycles):
+                job.passed_over += 1
+                if job.passed_over >= self.max_passed_over:
+                    other = (-1, other[1], job)
+            remaining.append(other)
+        heapq.heapify(remaining)
+        self._heap = remaining
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        # Retener solo los últimos trabajos terminados para no acumular resultados sin límite
+        finished = [job_id for job_id, other in self._jobs.items() if other.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _worker(self, short_only: bool):
+        while True:
+            job = self._next_job(short_only)
+            try:
+                job.simulator = self._create_simulator(job.params)
+                job.simulator.reset_simulation_data()
+                data = job.simulator.simulation_data
+                for record in job.simulator.iter_simulation(job.cycles):
+                    data['price_history'].append(record['price'])
+                    data['transactions'].extend(record['transactions'])
+                    job.progress = record['cycle']
+                    if job.cancel_requested.is_set():
+                        break
+                status = CANCELLED if job.cancel_requested.is_set() else DONE
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+            with self._cond:
+                self._finish(job, status)
+            # El callback corre con el trabajo ya terminado: si falla, el resultado se conserva
+            if status == DONE and self._on_done is not None:
+                try:
+                    self._on_done(job)
+                except Exception:
+                    logger.exception("Falló el callback on_done del trabajo %s", job.id)
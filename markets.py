@@ -0,0 +1,262 @@
+# markets.py
+"""
+    Varios mercados a la vez (monedas o exchanges), cada uno en su propio shard: un WebBoot con su
+    MarketAgent, su MessageDispatcher y sus inversores. Cada inversor tiene una subcuenta por mercado
+    (saldo fiat y cripto propios en cada shard), así los shards no comparten estado dentro de un tick
+    y pueden avanzar en paralelo, cada uno en un proceso worker.
+
+    El coordinador junta los registros de todos los shards en cada borde de tick, siempre en el orden
+    de los mercados: el resultado es el mismo con cualquier cantidad de workers (0 = sin procesos).
+"""
+
+import multiprocessing
+import os
+
+from sweep import derive_seeds
+
+# Parámetros de cada mercado (los que no se indican se toman de los parámetros comunes)
+MARKET_PARAMS = ('initial_price', 'price_model', 'order_book', 'batch_cnp', 'population_size', 'risk_mix')
+
+
+class MarketShard:
+    """Un mercado con su dispatcher y sus inversores, avanzado de a tramos de ticks."""
+
+    def __init__(self, spec: dict, cycles: int, snapshot_every: int = 50, sample_every: int = 1,
+                 keep_history: bool = True):
+        from simulation import WebBoot
+        from price_models import build_price_model
+
+        self.id = spec['id']
+        self.keep_history = keep_history
+        self.boot = WebBoot(snapshot_every=snapshot_every, sample_every=sample_every, keep_history=keep_history)
+        self.boot.initialize_agents(initial_price=spec.get('initial_price', 100.0),
+                                    population_size=spec.get('population_size', 0),
+                                    use_order_book=spec.get('order_book', False),
+                                    seed=spec.get('seed'),
+                                    risk_mix=spec.get('risk_mix'),
+                                    batch_cnp=spec.get('batch_cnp', False),
+                                    price_model=build_price_model(spec.get('price_model'), spec.get('seed'),
+                                                                  allow_files=spec.get('allow_files', True)),
+                                    market_id=self.id)
+        self.boot.reset_simulation_data()
+        self._ticks = self.boot.iter_simulation(cycles)
+
+    def advance(self, ticks: int) -> list:
+        """Corre hasta `ticks` ticks y retorna sus registros (menos si la corrida terminó)."""
+        data = self.boot.simulation_data
+        records = []
+        for record in self._ticks:
+            if self.keep_history:
+                data['price_history'].append(record['price'])
+                data['transactions'].extend(record['transactions'])
+            records.append(record)
+            if len(records) == ticks:
+                break
+        return records
+
+    def result(self) -> dict:
+        """Datos del mercado: estados registrados, estadísticas y subcuentas finales de los inversores."""
+        boot = self.boot
+        return {
+            'agent_states': boot.recorder.to_dict(),
+            'statistics': boot.stats.summary() if boot.stats.ticks else None,
+            'accounts': boot.current_state()['investors'],  # saldos finales (el último ciclo puede no muestrearse)
+        }
+
+
+def _shard_worker(conn, specs, cycles, snapshot_every, sample_every, keep_history=True):
+    """Proceso worker: es dueño de sus shards y los avanza cuando el coordinador lo pide."""
+    try:
+        shards = [MarketShard(spec, cycles, snapshot_every, sample_every, keep_history) for spec in specs]
+        conn.send(('ready', None))
+        while True:
+            command, argument = conn.recv()
+            if command == 'advance':
+                conn.send(('ok', [shard.advance(argument) for shard in shards]))
+            elif command == 'result':
+                conn.send(('ok', [shard.result() for shard in shards]))
+            else:
+                break
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+class MultiMarketBoot:
+    """
+    Simulación con varios mercados. `markets` es una lista de especificaciones, p. ej.
+    [{"id": "BTC", "initial_price": 100.0}, {"id": "ETH", "price_model": {"type": "gbm"}}];
+    cada una puede redefinir los parámetros de MARKET_PARAMS. Cada mercado recibe una semilla
+    derivada de `seed`.
+
+    Los shards se reparten entre `workers` procesos (por defecto, uno por núcleo hasta uno por
+    mercado; 0 corre todo en este proceso). Cada worker avanza `sync_every` ticks por pedido, y los
+    registros se combinan tick por tick. Con keep_history=False (streaming) los shards no guardan
+    el historial de estados.
+    """
+
+    def __init__(self, markets: list, seed=None, workers: int = None, sync_every: int = 1,
+                 snapshot_every: int = 50, sample_every: int = 1, keep_history: bool = True, **common):
+        if not markets:
+            raise ValueError("Se necesita al menos un mercado")
+        unknown = set(common) - set(MARKET_PARAMS) - {'allow_files'}
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+        if sync_every < 1:
+            raise ValueError("sync_every debe ser mayor que 0")
+        seeds = derive_seeds(seed, len(markets)) if seed is not None else [None] * len(markets)
+        self.specs = []
+        for i, market in enumerate(markets):
+            unknown = set(market) - set(MARKET_PARAMS) - {'id', 'seed'}
+            if unknown:
+                raise ValueError(f"Parámetros de mercado desconocidos: {', '.join(sorted(unknown))}")
+            spec = dict(common, id=f"Mercado{i + 1:02d}", seed=seeds[i])
+            spec.update(market)
+            self.specs.append(spec)
+        ids = [spec['id'] for spec in self.specs]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Los ids de los mercados deben ser únicos")
+        self.market_ids = ids
+        self.workers = min(len(markets), os.cpu_count() or 1) if workers is None else workers
+        self.sync_every = sync_every
+        self.snapshot_every = snapshot_every
+        self.sample_every = sample_every
+        self.keep_history = keep_history
+
+    def iter_simulation(self, cycles: int):
+        """
+        Generador de un registro por tick con los precios ({mercado: precio}), las transacciones de
+        todos los mercados (en el orden de los mercados) y los estados registrados por mercado.
+        Al terminar, `self.result` tiene los datos de cada mercado.
+        """
+        runner = _LocalRunner if self.workers <= 0 else _ProcessRunner
+        with runner(self, cycles) as shards:
+            done = 0
+            while done < cycles:
+                batches = shards.advance(self.sync_every)  # por mercado, una lista de registros
+                ticks = min(len(records) for records in batches)
+                for k in range(ticks):
+                    yield {
+                        'cycle': batches[0][k]['cycle'],
+                        'prices': {market_id: records[k]['price'] for market_id, records in zip(self.market_ids, batches)},
+                        'transactions': [transaction for records in batches for transaction in records[k]['transactions']],
+                        'agent_states': {market_id: records[k]['agent_state']
+                                         for market_id, records in zip(self.market_ids, batches)},
+                    }
+                done += self.sync_every
+                if ticks < self.sync_every:
+                    break
+            self.result = dict(zip(self.market_ids, shards.results()))
+
+    def run_simulation(self, cycles: int) -> dict:
+        """Corre todos los mercados y retorna los datos combinados."""
+        price_history = {market_id: [] for market_id in self.market_ids}
+        transactions = []
+        for record in self.iter_simulation(cycles):
+            for market_id, price in record['prices'].items():
+                price_history[market_id].append(price)
+            transactions.extend(record['transactions'])
+        return {
+            'markets': self.market_ids,
+            'price_history': price_history,
+            'transactions': transactions,
+            'agent_states': {market_id: data['agent_states'] for market_id, data in self.result.items()},
+            'statistics': {market_id: data['statistics'] for market_id, data in self.result.items()},
+            'portfolios': self.portfolios(),
+        }
+
+    def portfolios(self) -> dict:
+        """Cartera final de cada inversor: la suma de sus saldos fiat y el saldo cripto de cada mercado."""
+        portfolios = {}
+        for market_id, data in self.result.items():
+            for investor_id, account in data['accounts'].items():
+                portfolio = portfolios.setdefault(investor_id, {'fiat_balance': 0.0, 'crypto_balances': {}})
+                portfolio['fiat_balance'] = round(portfolio['fiat_balance'] + account['fiat_balance'], 2)
+                portfolio['crypto_balances'][market_id] = account['crypto_balance']
+        return portfolios
+
+
+class _LocalRunner:
+    """Todos los shards en este proceso (sin paralelismo)."""
+
+    def __init__(self, boot, cycles):
+        self._shards = [MarketShard(spec, cycles, boot.snapshot_every, boot.sample_every, boot.keep_history)
+                        for spec in boot.specs]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def advance(self, ticks):
+        return [shard.advance(ticks) for shard in self._shards]
+
+    def results(self):
+        return [shard.result() for shard in self._shards]
+
+
+class _ProcessRunner:
+    """Shards repartidos en procesos worker (el shard i va al worker i % workers)."""
+
+    def __init__(self, boot, cycles):
+        self._count = len(boot.specs)
+        workers = min(boot.workers, self._count)
+        context = multiprocessing.get_context('spawn')
+        self._conns = []
+        self._processes = []
+        for w in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_worker, daemon=True, name=f"market-shard-{w}",
+                                      args=(child, boot.specs[w::workers], cycles,
+                                            boot.snapshot_every, boot.sample_every, boot.keep_history))
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self):
+        try:
+            for conn in self._conns:
+                self._receive(conn)  # espera a que cada worker arme sus shards
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(('stop', None))
+            except OSError:
+                pass
+            conn.close()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        return False
+
+    def _request(self, command, argument=None):
+        for conn in self._conns:
+            conn.send((command, argument))
+        # Las respuestas se reordenan al orden de los mercados
+        ordered = [None] * self._count
+        workers = len(self._conns)
+        for w, conn in enumerate(self._conns):
+            for j, item in enumerate(self._receive(conn)):
+                ordered[w + j * workers] = item
+        return ordered
+
+    @staticmethod
+    def _receive(conn):
+        status, payload = conn.recv()
+        if status == 'error':
+            raise RuntimeError(f"Error en un worker de mercados: {payload}")
+        return payload
+
+    def advance(self, ticks):
+        return self._request('advance', ticks)
+
+    def results(self):
+        return self._request('result')
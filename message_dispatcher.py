@@ -3,28 +3,122 @@
     MessageDispatcher: Sistema de cola y despacho de mensajes entre agentes.
 """
 
+import heapq
+import itertools
 from collections import deque
-from typing import Dict, Optional
-from events import MarketEvent, FipaPerformative
+from typing import Callable, Dict, Optional
+from events import MarketEvent, FipaPerformative, EventPool
+
+
+def build_routes(agent) -> Dict[FipaPerformative, Callable]:
+    """
+    Arma la tabla de ruteo de un agente: performative -> método ligado.
+    Los handlers se declaran en el atributo de clase HANDLERS (performative -> nombre del método)
+    y se heredan/extienden en las subclases. Los performatives sin handler van a comms.receive_event.
+    """
+    handlers = {}
+    for cls in reversed(type(agent).__mro__):
+        handlers.update(cls.__dict__.get('HANDLERS', {}))
+
+    comms = getattr(agent, 'comms', None)
+    fallback = comms.receive_event if comms is not None else None
+    return {performative: getattr(agent, handlers[performative]) if performative in handlers else fallback
+            for performative in FipaPerformative}
+
+
+def build_batch_routes(agent) -> Dict[FipaPerformative, Callable]:
+    """
+    Handlers por lote de un agente: performative -> método que recibe la lista de todos los eventos
+    de ese performative que le llegan en una pasada del despacho. Se declaran en BATCH_HANDLERS.
+    """
+    handlers = {}
+    for cls in reversed(type(agent).__mro__):
+        handlers.update(cls.__dict__.get('BATCH_HANDLERS', {}))
+    return {performative: getattr(agent, name) for performative, name in handlers.items()}
 
 
 class MessageDispatcher:
     """Dispatcher centralizado para manejar la comunicación entre agentes."""
     
-    def __init__(self):
-        """Inicializa el dispatcher con una cola de mensajes."""
+    def __init__(self, history_size: Optional[int] = 1000, event_pool: Optional[EventPool] = None,
+                 message_ttl: int = 3, dead_letter_size: int = 1000):
+        """
+        Inicializa el dispatcher con una cola de mensajes.
+
+        Args:
+            history_size: Capacidad del historial circular de mensajes (0 lo deshabilita, None no lo limita)
+            event_pool: Pool opcional para reutilizar eventos ya entregados (requiere historial deshabilitado)
+            message_ttl: Llamados a dispatch que un mensaje sin receptor espera a que el receptor se registre
+                         antes de pasar a la cola de mensajes muertos (cada evento puede fijar su propio ttl)
+            dead_letter_size: Capacidad de la cola de mensajes muertos (los más viejos se descartan)
+        """
+        if event_pool is not None and history_size != 0:
+            raise ValueError("El pool de eventos requiere el historial deshabilitado (history_size=0)")
+
         self.message_queue = deque()  # Cola de mensajes pendientes
         self.agents = {}  # Registro de agentes por ID
-        self.message_history = []  # Historial de mensajes (opcional, para debugging)
+        self._routes = {}  # Tabla de ruteo por ID de agente, armada al registrarlo
+        self._plain_routes = {}  # Igual, sin observadores (para multicast, que los llama una vez por evento)
+        self._batch_routes = {}  # Handlers por lote, solo de los agentes que los declaran
+        self._listeners = {}  # Observadores por performative (se llaman antes de entregar)
+        # Historial de mensajes (opcional, para debugging): buffer circular con los últimos mensajes
+        self.message_history = deque(maxlen=history_size) if history_size != 0 else None
+        self.event_pool = event_pool
+        self.message_counts = None  # Counter por performative, solo si se activa la instrumentación
+
+        # Mensajes sin receptor: se estacionan por receptor (no se vuelven a recorrer en cada pasada)
+        # y se entregan si el receptor se registra antes de que venza su ttl
+        self.message_ttl = message_ttl
+        self._parked = {}  # receptor -> {secuencia: evento}
+        self._expirations = []  # heap de (llamado a dispatch en que vence, secuencia, receptor)
+        self._park_seq = itertools.count()
+        self._round = 0  # llamados a dispatch
+        self.dead_letters = deque(maxlen=dead_letter_size)  # (evento, motivo)
+        self.expired_count = 0  # mensajes que vencieron sin receptor
+        self.dropped_count = 0  # mensajes muertos descartados por falta de lugar
+        self.redelivered_count = 0  # mensajes estacionados entregados tras registrarse el receptor
     
     def register_agent(self, agent_id: str, agent):
-        """Registra un agente en el dispatcher."""
+        """Registra un agente en el dispatcher y liga sus handlers."""
         self.agents[agent_id] = agent
+        self._routes[agent_id] = self._bind_routes(agent)
+        self._plain_routes[agent_id] = build_routes(agent)
+        batch_routes = build_batch_routes(agent)
+        if batch_routes:
+            self._batch_routes[agent_id] = batch_routes
+        parked = self._parked.pop(agent_id, None)
+        if parked:
+            # Mensajes que esperaban a este agente: vuelven a la cola
+            self.message_queue.extend(parked.values())
+            self.redelivered_count += len(parked)
     
     def unregister_agent(self, agent_id: str):
         """Elimina un agente del registro."""
         if agent_id in self.agents:
             del self.agents[agent_id]
+            del self._routes[agent_id]
+            del self._plain_routes[agent_id]
+            self._batch_routes.pop(agent_id, None)
+
+    def add_listener(self, performative: FipaPerformative, callback: Callable):
+        """Registra un observador que recibe cada evento del performative antes de entregarlo."""
+        self._listeners.setdefault(performative, []).append(callback)
+        for agent_id, agent in self.agents.items():
+            self._routes[agent_id] = self._bind_routes(agent)
+
+    def _bind_routes(self, agent) -> Dict[FipaPerformative, Callable]:
+        """Tabla de ruteo del agente con los observadores ya incorporados."""
+        routes = build_routes(agent)
+        for performative, listeners in self._listeners.items():
+            handler = routes[performative]
+
+            def observed(event, handler=handler, listeners=tuple(listeners)):
+                for listener in listeners:
+                    listener(event)
+                handler(event)
+
+            routes[performative] = observed
+        return routes
     
     def send_event(self, event: MarketEvent):
         """Envía un evento a la cola de mensajes."""
@@ -33,9 +127,23 @@ class MessageDispatcher:
         
         # Agregar a la cola
         self.message_queue.append(event)
+        if self.message_counts is not None:
+            self.message_counts[event.performative] += 1
         
         # Opcional: guardar en historial
-        self.message_history.append(event)
+        if self.message_history is not None:
+            self.message_history.append(event)
+
+    def create_event(self, sender: str, receiver: str, performative: FipaPerformative, content: dict) -> MarketEvent:
+        """Crea un evento, reutilizando uno del pool si está configurado."""
+        if self.event_pool is not None:
+            return self.event_pool.acquire(sender, receiver, performative, content)
+        return MarketEvent(sender, receiver, performative, content)
+
+    def recycle_event(self, event: MarketEvent):
+        """Devuelve al pool un evento ya entregado (si hay pool)."""
+        if self.event_pool is not None:
+            self.event_pool.release(event)
     
     def dispatch(self, max_iterations: int = 10) -> int:
         """
@@ -49,60 +157,199 @@ class MessageDispatcher:
         """
         processed = 0
         iterations = 0
+        self._round += 1
+        if self._expirations:
+            self._expire_parked()
         
         while self.message_queue and iterations < max_iterations:
-            # Procesar todos los mensajes actuales en la cola
-            current_batch = list(self.message_queue)
-            self.message_queue.clear()
-            
+            # Tomar la cola actual sin copiarla; los mensajes nuevos van a una cola nueva
+            current_batch = self.message_queue
+            self.message_queue = deque()
+
+            # Agrupar por receptor para resolver la ruta una sola vez por agente.
+            # Los eventos multicast (receiver es una tupla de ids) se entregan aparte.
+            by_receiver = {}
+            multicast = []
             for event in current_batch:
-                target_agent = self.agents.get(event.receiver)
-                
-                if target_agent:
-                    # Entregar el mensaje al agente
-                    self._deliver_to_agent(target_agent, event)
-                    processed += 1
+                receiver = event.receiver
+                if receiver.__class__ is tuple:
+                    multicast.append(event)
+                    continue
+                group = by_receiver.get(receiver)
+                if group is None:
+                    by_receiver[receiver] = [event]
+                else:
+                    group.append(event)
+
+            for receiver, events in by_receiver.items():
+                routes = self._routes.get(receiver)
+                if routes is None:
+                    # Si no hay receptor, estacionar los mensajes hasta que se registre o venza su ttl
+                    for event in events:
+                        self._park(receiver, event)
+                    continue
+
+                # Entregar los mensajes al agente
+                batch_routes = self._batch_routes.get(receiver)
+                if batch_routes is not None:
+                    self._deliver_batches(routes, batch_routes, events)
+                elif self.event_pool is None:
+                    for event in events:
+                        routes[event.performative](event)
                 else:
-                    # Si no hay receptor, mantener el mensaje en la cola
-                    self.message_queue.append(event)
+                    for event in events:
+                        routes[event.performative](event)
+                        self.event_pool.release(event)
+                processed += len(events)
+
+            for event in multicast:
+                self._deliver_multicast(event)
+                processed += 1
             
             iterations += 1
         
         return processed
     
+    def _deliver_batches(self, routes, batch_routes, events):
+        """Entrega los eventos de un agente con handlers por lote: un llamado por performative con la lista."""
+        batches = {}
+        for event in events:
+            if event.performative in batch_routes:
+                batches.setdefault(event.performative, []).append(event)
+            else:
+                routes[event.performative](event)
+        for performative, batch in batches.items():
+            for listener in self._listeners.get(performative, ()):
+                for event in batch:
+                    listener(event)
+            batch_routes[performative](batch)
+        if self.event_pool is not None:
+            for event in events:
+                self.event_pool.release(event)
+
+    def _deliver_multicast(self, event: MarketEvent):
+        """Entrega un evento a todos sus receptores; los observadores lo ven una sola vez."""
+        for listener in self._listeners.get(event.performative, ()):
+            listener(event)
+        missing = False
+        for receiver in event.receiver:
+            routes = self._plain_routes.get(receiver)
+            if routes is None:
+                # Los receptores todavía no registrados reciben una copia si se registran a tiempo
+                missing = True
+                self._park(receiver, MarketEvent(event.sender, receiver, event.performative, event.content, event.ttl))
+            else:
+                routes[event.performative](event)
+        if not missing and self.event_pool is not None:
+            self.event_pool.release(event)
+
+    def _park(self, receiver, event: MarketEvent):
+        """Estaciona un mensaje sin receptor (o lo manda a mensajes muertos si su ttl es 0)."""
+        ttl = self.message_ttl if event.ttl is None else event.ttl
+        if ttl <= 0:
+            self._dead_letter(event, 'unroutable')
+            return
+        seq = next(self._park_seq)
+        self._parked.setdefault(receiver, {})[seq] = event
+        heapq.heappush(self._expirations, (self._round + ttl, seq, receiver))
+
+    def _expire_parked(self):
+        """Pasa a mensajes muertos los estacionados cuyo ttl venció (solo recorre los vencidos)."""
+        expirations = self._expirations
+        while expirations and expirations[0][0] < self._round:
+            _, seq, receiver = heapq.heappop(expirations)
+            parked = self._parked.get(receiver)
+            event = parked.pop(seq, None) if parked else None
+            if event is None:
+                continue  # ya se entregó
+            if not parked:
+                del self._parked[receiver]
+            self.expired_count += 1
+            self._dead_letter(event, 'expired')
+
+    def _dead_letter(self, event: MarketEvent, reason: str):
+        if len(self.dead_letters) == self.dead_letters.maxlen:
+            self.dropped_count += 1
+        self.dead_letters.append((event, reason))
+
+    def get_dead_letters(self) -> list:
+        """Mensajes muertos (los más recientes al final), para inspección."""
+        return [{'sender': event.sender, 'receiver': event.receiver, 'performative': event.performative.value,
+                 'content': event.content.to_dict() if hasattr(event.content, 'to_dict') else event.content,
+                 'reason': reason}
+                for event, reason in self.dead_letters]
+
+    def parked_count(self) -> int:
+        """Mensajes estacionados esperando a su receptor."""
+        return sum(len(parked) for parked in self._parked.values())
+
+    def get_delivery_stats(self) -> dict:
+        return {
+            'parked': self.parked_count(),
+            'redelivered': self.redelivered_count,
+            'expired': self.expired_count,
+            'dropped': self.dropped_count,
+            'dead_letters': len(self.dead_letters),
+        }
+
     def _deliver_to_agent(self, agent, event: MarketEvent):
         """
         Entrega un evento al agente correspondiente según su performative.
         """
-        from agents import MarketAgent, InvestorAgent
-
-        # Si es el MarketAgent, usar sus métodos específicos
-        if isinstance(agent, MarketAgent):
-            if event.performative == FipaPerformative.CFP:
-                agent.process_cfp(event)
-            elif event.performative == FipaPerformative.ACCEPT_PROPOSAL:
-                agent.process_accept(event)
-            else:
-                # Para otros performatives, usar receive_event
-                agent.comms.receive_event(event)
-        
-        # Si es un InvestorAgent, usar sus métodos específicos
-        elif isinstance(agent, InvestorAgent):
-            if event.performative == FipaPerformative.PROPOSE:
-                agent.handle_propose(event)
-            elif event.performative == FipaPerformative.INFORM:
-                agent.handle_inform(event)
-            else:
-                # Para otros performatives, usar receive_event
-                agent.comms.receive_event(event)
-        
-        # Para otros tipos de agentes, usar receive_event genérico
-        else:
-            agent.comms.receive_event(event)
+        routes = self._routes.get(agent.id)
+        if routes is None:
+            routes = self._bind_routes(agent)
+        routes[event.performative](event)
     
+    def get_state(self) -> dict:
+        """
+        Estado de entrega completo como tuplas simples (para checkpoints): la cola, los mensajes
+        estacionados con sus vencimientos, los mensajes muertos, los contadores y el número de despacho.
+        """
+        next_seq = next(self._park_seq)
+        self._park_seq = itertools.count(next_seq)  # leer el contador lo consume
+        return {
+            'queue': [_event_tuple(event) for event in self.message_queue],
+            'parked': [(receiver, seq, _event_tuple(event))
+                       for receiver, parked in self._parked.items() for seq, event in parked.items()],
+            'expirations': list(self._expirations),
+            'next_seq': next_seq,
+            'round': self._round,
+            'message_ttl': self.message_ttl,
+            'dead_letters': [(_event_tuple(event), reason) for event, reason in self.dead_letters],
+            'expired': self.expired_count,
+            'dropped': self.dropped_count,
+            'redelivered': self.redelivered_count,
+        }
+
+    def set_state(self, state):
+        """
+        Reconstruye el estado de entrega desde get_state. También acepta el formato anterior (solo una
+        lista de mensajes pendientes, con los estacionados mezclados en la cola).
+        """
+        if isinstance(state, list):
+            self.message_queue = deque(_event_from_tuple(item) for item in state)
+            return
+        self.message_queue = deque(_event_from_tuple(item) for item in state['queue'])
+        self._parked = {}
+        for receiver, seq, item in state['parked']:
+            self._parked.setdefault(receiver, {})[seq] = _event_from_tuple(item)
+        self._expirations = list(state['expirations'])
+        heapq.heapify(self._expirations)
+        self._park_seq = itertools.count(state['next_seq'])
+        self._round = state['round']
+        self.message_ttl = state['message_ttl']
+        self.dead_letters.clear()
+        self.dead_letters.extend((_event_from_tuple(item), reason) for item, reason in state['dead_letters'])
+        self.expired_count = state['expired']
+        self.dropped_count = state['dropped']
+        self.redelivered_count = state['redelivered']
+
     def clear_queue(self):
-        """Limpia la cola de mensajes."""
+        """Limpia la cola de mensajes (y los mensajes estacionados)."""
         self.message_queue.clear()
+        self._parked.clear()
+        self._expirations.clear()
     
     def get_queue_size(self) -> int:
         """Retorna el tamaño actual de la cola."""
@@ -113,6 +360,17 @@ class MessageDispatcher:
         return len(self.message_queue) > 0
 
 
+def _event_tuple(event: MarketEvent) -> tuple:
+    content = event.content.to_dict() if hasattr(event.content, 'to_dict') else dict(event.content)
+    return event.sender, event.receiver, event.performative.value, content, event.ttl
+
+
+def _event_from_tuple(item) -> MarketEvent:
+    sender, receiver, performative, content = item[:4]
+    ttl = item[4] if len(item) > 4 else None
+    return MarketEvent(sender, receiver, FipaPerformative(performative), content, ttl)
+
+
 # Instancia global del dispatcher (singleton pattern)
 _global_dispatcher: Optional[MessageDispatcher] = None
 
@@ -0,0 +1,129 @@
+# metrics.py
+"""
+    Instrumentación del ciclo de simulación: tiempos por fase, mensajes por performative,
+    profundidad de la cola, tamaño del historial, mensajes sin receptor y asignaciones de memoria por tick.
+    Los perfiles de cada corrida se acumulan en un registro global que /api/metrics expone
+    en formato de texto de Prometheus.
+"""
+
+import sys
+import threading
+from collections import Counter
+
+# Fases de un ciclo de WebBoot.iter_simulation
+PHASES = ('market', 'decisions', 'dispatch', 'capture')
+
+
+class SimulationProfiler:
+    """Perfil de una corrida. Solo existe si la instrumentación está activada."""
+
+    def __init__(self):
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.ticks = 0
+        self.messages = Counter()  # mensajes enviados por performative
+        self.queue_depth_max = 0
+        self.history_size = 0
+        self.allocated_blocks = 0  # bloques asignados (netos) durante los ticks
+        self._tick_start_blocks = 0
+        self.delivery = {}  # mensajes estacionados, vencidos y descartados (ver MessageDispatcher)
+
+    # WebBoot mide con time.perf_counter() directamente para no pagar un context manager por fase
+    def add_phase(self, phase: str, seconds: float):
+        self.phase_seconds[phase] += seconds
+
+    def start_tick(self):
+        self._tick_start_blocks = sys.getallocatedblocks()
+
+    def end_tick(self, dispatcher):
+        self.ticks += 1
+        self.allocated_blocks += sys.getallocatedblocks() - self._tick_start_blocks
+        if dispatcher.message_history is not None:
+            self.history_size = len(dispatcher.message_history)
+        self.delivery = dispatcher.get_delivery_stats()
+
+    def observe_queue(self, depth: int):
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def to_dict(self) -> dict:
+        return {
+            'ticks': self.ticks,
+            'phase_seconds': dict(self.phase_seconds),
+            'phase_seconds_per_tick': {phase: seconds / self.ticks if self.ticks else 0.0
+                                       for phase, seconds in self.phase_seconds.items()},
+            'messages': {performative.value: count for performative, count in self.messages.items()},
+            'queue_depth_max': self.queue_depth_max,
+            'message_history_size': self.history_size,
+            'allocated_blocks_per_tick': self.allocated_blocks / self.ticks if self.ticks else 0.0,
+            'delivery': dict(self.delivery),
+        }
+
+
+class MetricsRegistry:
+    """Acumula los perfiles de todas las corridas instrumentadas del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.ticks = 0
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.messages = Counter()
+        self.queue_depth_max = 0
+        self.history_size = 0
+        self.allocated_blocks_per_tick = 0.0
+        self.expired = 0
+        self.dropped = 0
+        self.parked = 0
+
+    def record(self, profiler: SimulationProfiler):
+        """Agrega el perfil de una corrida terminada."""
+        with self._lock:
+            self.runs += 1
+            self.ticks += profiler.ticks
+            for phase, seconds in profiler.phase_seconds.items():
+                self.phase_seconds[phase] += seconds
+            for performative, count in profiler.messages.items():
+                self.messages[performative.value] += count
+            self.queue_depth_max = max(self.queue_depth_max, profiler.queue_depth_max)
+            self.history_size = profiler.history_size
+            if profiler.ticks:
+                self.allocated_blocks_per_tick = profiler.allocated_blocks / profiler.ticks
+            self.expired += profiler.delivery.get('expired', 0)
+            self.dropped += profiler.delivery.get('dropped', 0)
+            self.parked = profiler.delivery.get('parked', 0)
+
+    def render_prometheus(self) -> str:
+        """Exporta las métricas en formato de texto de Prometheus."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        with self._lock:
+            metric('simulador_runs_total', 'counter', 'Corridas instrumentadas.', [('', self.runs)])
+            metric('simulador_ticks_total', 'counter', 'Ciclos simulados en corridas instrumentadas.',
+                   [('', self.ticks)])
+            metric('simulador_phase_seconds_total', 'counter', 'Tiempo acumulado por fase del ciclo.',
+                   [(f'{{phase="{phase}"}}', seconds) for phase, seconds in self.phase_seconds.items()])
+            metric('simulador_messages_total', 'counter', 'Mensajes enviados por performative FIPA.',
+                   [(f'{{performative="{performative}"}}', count) for performative, count in sorted(self.messages.items())])
+            metric('simulador_queue_depth_max', 'gauge', 'Profundidad máxima de la cola de mensajes.',
+                   [('', self.queue_depth_max)])
+            metric('simulador_message_history_size', 'gauge', 'Mensajes retenidos en el historial (última corrida).',
+                   [('', self.history_size)])
+            metric('simulador_messages_expired_total', 'counter', 'Mensajes sin receptor cuyo ttl venció.',
+                   [('', self.expired)])
+            metric('simulador_dead_letters_dropped_total', 'counter',
+                   'Mensajes muertos descartados por la cola de mensajes muertos llena.', [('', self.dropped)])
+            metric('simulador_messages_parked', 'gauge', 'Mensajes esperando a su receptor (última corrida).',
+                   [('', self.parked)])
+            metric('simulador_allocated_blocks_per_tick', 'gauge', 'Bloques de memoria asignados por tick (última corrida).',
+                   [('', self.allocated_blocks_per_tick)])
+        return "\n".join(lines) + "\n"
+
+
+# Registro global del proceso (lo expone /api/metrics)
+REGISTRY = MetricsRegistry()
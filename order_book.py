@@ -0,0 +1,211 @@
+# order_book.py
+"""
+    Libro de ordenes limite con prioridad precio-tiempo para el MarketAgent.
+"""
+
+import heapq
+from collections import deque, namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from events import TransactionType
+
+# Se reconstruye un heap cuando tiene más de STALE_FACTOR entradas por nivel vivo (más MIN_REBUILD)
+STALE_FACTOR = 2
+MIN_REBUILD = 16
+
+# Una operacion ejecutada: el maker es la orden que estaba en el libro, el taker la que llego.
+Trade = namedtuple('Trade', ['price', 'quantity', 'taker_side', 'taker', 'maker', 'taker_order_id', 'maker_order_id'])
+
+
+class Order:
+    """Orden limite. price=None indica una orden a mercado."""
+    __slots__ = ('order_id', 'owner', 'side', 'price', 'quantity', 'seq')
+
+    def __init__(self, order_id: int, owner: str, side: TransactionType, price: Optional[float], quantity: float, seq: int):
+        self.order_id = order_id
+        self.owner = owner
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.seq = seq
+
+    def __repr__(self):
+        return f"Order({self.order_id}, {self.owner}, {self.side.value}, {self.price}, {self.quantity})"
+
+
+class OrderBook:
+    """
+    Libro de ordenes con niveles de precio ordenados.
+    - Los mejores precios se mantienen en heaps (compras con precio negado), insercion O(log n).
+    - Cada nivel es una cola FIFO (prioridad temporal dentro del mismo precio).
+    - La cancelacion es O(1): la orden se marca y se descarta al llegar al frente del nivel.
+    - Un precio entra una sola vez a su heap; las entradas de niveles vacios se descartan al llegar
+      al tope o al reconstruir el heap desde los niveles vivos (si superan STALE_FACTOR por nivel).
+    """
+
+    def __init__(self):
+        self._bids: List[float] = []  # heap de -precio
+        self._asks: List[float] = []  # heap de precio
+        self._in_heap: Dict[TransactionType, set] = {TransactionType.BUY: set(), TransactionType.SELL: set()}
+        self._levels: Dict[TransactionType, Dict[float, deque]] = {TransactionType.BUY: {}, TransactionType.SELL: {}}
+        self._level_counts: Dict[TransactionType, Dict[float, int]] = {TransactionType.BUY: {}, TransactionType.SELL: {}}
+        self._orders: Dict[int, Order] = {}  # ordenes vivas en el libro
+        self._next_id = 1
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._orders)
+
+    # --- Consultas ---
+
+    def best_bid(self) -> Optional[float]:
+        """Mejor precio de compra en el libro (o None si no hay)."""
+        levels = self._levels[TransactionType.BUY]
+        while self._bids and -self._bids[0] not in levels:
+            self._in_heap[TransactionType.BUY].discard(-heapq.heappop(self._bids))
+        return -self._bids[0] if self._bids else None
+
+    def best_ask(self) -> Optional[float]:
+        """Mejor precio de venta en el libro (o None si no hay)."""
+        levels = self._levels[TransactionType.SELL]
+        while self._asks and self._asks[0] not in levels:
+            self._in_heap[TransactionType.SELL].discard(heapq.heappop(self._asks))
+        return self._asks[0] if self._asks else None
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        return self._orders.get(order_id)
+
+    # --- Insercion y cancelacion ---
+
+    def add(self, owner: str, side: TransactionType, price: float, quantity: float) -> Order:
+        """Agrega una orden limite al libro sin intentar cruzarla."""
+        order = self._new_order(owner, side, price, quantity)
+        self._rest(order)
+        return order
+
+    def cancel(self, order_id: int) -> bool:
+        """Cancela una orden viva. Retorna False si ya no esta en el libro."""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        order.quantity = 0.0
+        self._release(order)
+        return True
+
+    def _new_order(self, owner: str, side: TransactionType, price: Optional[float], quantity: float) -> Order:
+        order = Order(self._next_id, owner, side, price, quantity, self._next_seq)
+        self._next_id += 1
+        self._next_seq += 1
+        return order
+
+    def _rest(self, order: Order):
+        levels = self._levels[order.side]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = deque()
+            self._level_counts[order.side][order.price] = 0
+            in_heap = self._in_heap[order.side]
+            if order.price not in in_heap:  # si quedó una entrada de un nivel anterior, se reutiliza
+                in_heap.add(order.price)
+                if order.side == TransactionType.BUY:
+                    heapq.heappush(self._bids, -order.price)
+                else:
+                    heapq.heappush(self._asks, order.price)
+        level.append(order)
+        self._level_counts[order.side][order.price] += 1
+        self._orders[order.order_id] = order
+
+    def _release(self, order: Order):
+        """Descuenta una orden de su nivel y elimina el nivel si quedo vacio."""
+        counts = self._level_counts[order.side]
+        counts[order.price] -= 1
+        if counts[order.price] == 0:
+            del counts[order.price]
+            del self._levels[order.side][order.price]
+            heap = self._bids if order.side == TransactionType.BUY else self._asks
+            if len(heap) > STALE_FACTOR * len(counts) + MIN_REBUILD:
+                self._rebuild_heap(order.side)
+
+    def _rebuild_heap(self, side: TransactionType):
+        """Rehace el heap de un lado con los precios de sus niveles vivos (descarta las entradas viejas)."""
+        prices = list(self._levels[side])
+        self._in_heap[side] = set(prices)
+        if side == TransactionType.BUY:
+            self._bids = [-price for price in prices]
+            heapq.heapify(self._bids)
+        else:
+            self._asks = prices
+            heapq.heapify(self._asks)
+
+    # --- Matching ---
+
+    def submit(self, owner: str, side: TransactionType, price: Optional[float], quantity: float,
+               ioc: bool = False) -> Tuple[Order, List[Trade]]:
+        """
+        Cruza una orden contra el libro con prioridad precio-tiempo.
+        El remanente queda en el libro salvo que sea a mercado (price=None) o ioc=True.
+        """
+        order = self._new_order(owner, side, price, quantity)
+        trades: List[Trade] = []
+
+        is_buy = side == TransactionType.BUY
+        if is_buy:
+            opposite, best = self._levels[TransactionType.SELL], self.best_ask
+        else:
+            opposite, best = self._levels[TransactionType.BUY], self.best_bid
+
+        while order.quantity > 0:
+            level_price = best()
+            if level_price is None:
+                break
+            if price is not None and (level_price > price if is_buy else level_price < price):
+                break
+            level = opposite[level_price]
+            while level and order.quantity > 0:
+                maker = level[0]
+                if maker.quantity <= 0:  # cancelada
+                    level.popleft()
+                    continue
+                fill = min(order.quantity, maker.quantity)
+                trades.append(Trade(level_price, fill, side, owner, maker.owner, order.order_id, maker.order_id))
+                order.quantity -= fill
+                maker.quantity -= fill
+                if maker.quantity <= 0:
+                    level.popleft()
+                    del self._orders[maker.order_id]
+                    self._release(maker)
+
+        if order.quantity > 0 and price is not None and not ioc:
+            self._rest(order)
+        return order, trades
+
+    def submit_many(self, orders) -> Tuple[List[Order], List[Trade]]:
+        """Cruza en bloque las ordenes de un tick, en orden de llegada: (owner, side, price, quantity)."""
+        submitted, trades = [], []
+        for owner, side, price, quantity in orders:
+            order, fills = self.submit(owner, side, price, quantity)
+            submitted.append(order)
+            trades.extend(fills)
+        return submitted, trades
+
+    # --- Checkpoint ---
+
+    def get_state(self) -> dict:
+        """Estado completo del libro (las ordenes se comparten entre niveles y registro).
+        Los heaps se guardan solo con los niveles vivos (una lista ordenada ya es un heap)."""
+        return {
+            'bids': sorted(-price for price in self._levels[TransactionType.BUY]),
+            'asks': sorted(self._levels[TransactionType.SELL]),
+            'levels': self._levels, 'level_counts': self._level_counts, 'orders': self._orders,
+            'next_id': self._next_id, 'next_seq': self._next_seq,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'OrderBook':
+        book = cls()
+        book._bids, book._asks = state['bids'], state['asks']
+        book._in_heap = {TransactionType.BUY: {-price for price in book._bids},
+                         TransactionType.SELL: set(book._asks)}
+        book._levels, book._level_counts, book._orders = state['levels'], state['level_counts'], state['orders']
+        book._next_id, book._next_seq = state['next_id'], state['next_seq']
+        return book
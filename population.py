@@ -0,0 +1,164 @@
+# population.py
+"""
+    Poblacion vectorizada de inversores: guarda los saldos, la tolerancia al riesgo y las
+    acciones pendientes de N inversores como arreglos NumPy y decide para todos en una sola llamada.
+"""
+
+import numpy as np
+
+from agents import Agent
+from capacities import EvaluationCapacity
+from events import MarketEvent, FipaPerformative, TransactionType
+from skills import BatchInvestmentSkill, TriggerIndex, ACTION_NONE, ACTION_BUY, ACTION_SELL
+from tracing import TRACER, INFO, POPULATION_INIT
+
+_ACTION_CODES = {
+    TransactionType.BUY.value: ACTION_BUY,
+    TransactionType.SELL.value: ACTION_SELL,
+}
+
+
+class InvestorPopulation(Agent, EvaluationCapacity):
+    """
+    Agente que representa a muchos inversores a la vez (modo poblacion).
+    Cada inversor se comporta igual que un InvestorAgent, pero la negociacion FIPA CNP
+    se hace una vez por tipo de transaccion y por tick: el CFP lleva la cantidad de inversores
+    que quieren operar y el INFORM se aplica a todos ellos de forma vectorizada.
+    Las decisiones usan un TriggerIndex: cada tick solo se visitan los inversores que actuan.
+    """
+
+    IS_POPULATION = True
+
+    HANDLERS = {
+        FipaPerformative.PROPOSE: 'handle_propose',
+        FipaPerformative.INFORM: 'handle_inform',
+    }
+
+    def __init__(self, id: str, risk_tolerance, fiat_balance=1000.0, crypto_balance=10.0, market_id="Mercado01"):
+        super().__init__(id)
+        self.risk_tolerance = np.asarray(risk_tolerance, dtype=np.float64)
+        size = self.risk_tolerance.shape[0]
+        self.fiat_balance = np.broadcast_to(np.asarray(fiat_balance, dtype=np.float64), (size,)).copy()
+        self.crypto_balance = np.broadcast_to(np.asarray(crypto_balance, dtype=np.float64), (size,)).copy()
+        self.pending_action = np.zeros(size, dtype=np.int8)  # ACTION_NONE / ACTION_BUY / ACTION_SELL
+        self.skill = BatchInvestmentSkill()
+        self.market_id = market_id
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        """Recalcula el indice de disparadores (llamar si cambian las tolerancias al riesgo)."""
+        self.trigger_index = TriggerIndex(self.risk_tolerance, self.skill)
+        # Indices (ordenados) de los inversores con accion pendiente, por tipo de accion
+        self._pending = {code: np.flatnonzero(self.pending_action == code) for code in (ACTION_BUY, ACTION_SELL)}
+
+    @property
+    def size(self) -> int:
+        return self.risk_tolerance.shape[0]
+
+    def initialize(self):
+        super().initialize()
+        if TRACER.level <= INFO:
+            TRACER.emit(POPULATION_INIT, self.id, self.size, float(self.risk_tolerance.mean()))
+
+    def run_cycle(self, tick: int, market_history: list):
+        if len(market_history) < 2:
+            return
+
+        current_price = market_history[-1]
+        price_change = self.evaluate_price_change(current_price, market_history)
+
+        # Limpiar solo las acciones pendientes del tick anterior y marcar las nuevas
+        buys, sells = self.trigger_index.triggered(price_change)
+        for code, indices in ((ACTION_BUY, buys), (ACTION_SELL, sells)):
+            self.pending_action[self._pending[code]] = ACTION_NONE
+            self._pending[code] = indices
+        for code, indices in self._pending.items():
+            self.pending_action[indices] = code
+
+        # 1. CFP: un mensaje por tipo de transaccion con la cantidad de inversores que quieren operar
+        for action in (TransactionType.BUY, TransactionType.SELL):
+            count = len(self._pending[_ACTION_CODES[action.value]])
+            if count:
+                cfp_content = {"request": "offer_for_trade", "type": action.value, "amount": 1.0, "count": count}
+                self.comms.send_event(self.comms.create_event(self.id, self.market_id, FipaPerformative.CFP, cfp_content))
+
+    def handle_propose(self, event: MarketEvent):
+        """Acepta la propuesta para todos los inversores con la accion pendiente correspondiente."""
+        action = event.content.get("type")
+        code = _ACTION_CODES.get(action)
+        if code is None:
+            return
+
+        count = len(self._pending[code])
+        if count == 0:
+            return
+
+        # 2. ACCEPT_PROPOSAL
+        price = event.content.get("price")
+        limit = event.content.get("best_sell" if code == ACTION_BUY else "best_buy", price)
+        accept_content = {"price": price, "type": action, "limit": limit, "count": count}
+        self.comms.send_event(self.comms.create_event(self.id, self.market_id, FipaPerformative.ACCEPT_PROPOSAL, accept_content))
+
+    def handle_inform(self, event: MarketEvent):
+        """
+        Aplica la transaccion confirmada a los inversores que la esperaban.
+        Con libro de ordenes la ejecucion puede ser parcial: se completan los primeros `count` pendientes.
+        """
+        fills = event.content.get("fills")
+        if fills is not None:
+            # INFORM en lote (BatchMarketAgent): solo los resultados de esta poblacion
+            for fill in fills.get(self.id, ()):
+                self._apply_fill(fill)
+        else:
+            self._apply_fill(event.content)
+
+    def _apply_fill(self, content):
+        """Aplica el resultado de una transaccion (contenido de un INFORM)."""
+        if content.get("status") != "success":
+            return
+
+        code = _ACTION_CODES.get(content.get("action"))
+        if code is None:
+            return
+
+        price = content.get("price")
+        amount = 1.0  # Cantidad simplificada, igual que InvestorAgent
+        count = int(content.get("count", 1))
+        filled, self._pending[code] = self._pending[code][:count], self._pending[code][count:]
+        if code == ACTION_BUY:
+            self.crypto_balance[filled] += amount
+            self.fiat_balance[filled] -= price * amount
+        else:
+            self.crypto_balance[filled] -= amount
+            self.fiat_balance[filled] += price * amount
+
+        # Limpiar la accion pendiente despues de ejecutar
+        self.pending_action[filled] = ACTION_NONE
+
+    def summary(self) -> dict:
+        """Resumen agregado de la poblacion (para capturar estados sin volcar N inversores)."""
+        return {
+            'size': self.size,
+            'fiat_balance': round(float(self.fiat_balance.sum()), 2),
+            'crypto_balance': round(float(self.crypto_balance.sum()), 2),
+            'mean_risk_tolerance': round(float(self.risk_tolerance.mean()), 4),
+        }
+
+    def get_state(self) -> dict:
+        """Estado de la poblacion para checkpoints (los arreglos se serializan en binario)."""
+        return {
+            'id': self.id,
+            'risk_tolerance': self.risk_tolerance,
+            'fiat_balance': self.fiat_balance,
+            'crypto_balance': self.crypto_balance,
+            'pending_action': self.pending_action,
+            'market_id': self.market_id,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'InvestorPopulation':
+        population = cls(state['id'], state['risk_tolerance'], state['fiat_balance'], state['crypto_balance'])
+        population.pending_action = np.array(state['pending_action'], dtype=np.int8)
+        population.market_id = state['market_id']
+        population.rebuild_index()
+        return population
@@ -0,0 +1,274 @@
+# price_models.py
+"""
+    Modelos de precio intercambiables para MarketAgent: movimiento browniano geométrico, volatilidad
+    tipo GARCH(1,1), difusión con saltos y repetición de una serie histórica en CSV.
+    Los shocks se generan con NumPy en bloques de miles de ticks y se consumen de a uno por tick,
+    así el costo por tick en Python es una multiplicación.
+"""
+
+import csv
+import inspect
+import math
+from numbers import Real
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 4096
+MAX_WEB_BLOCK_SIZE = 1 << 16  # tope de block_size pedido desde la API web (memoria por bloque)
+
+
+class PriceModel:
+    """
+    Base de los modelos: cada subclase genera en bloque los log-retornos de los próximos n ticks
+    (`_generate`). El modelo guarda el bloque como factores multiplicativos y los entrega en orden.
+    """
+
+    def __init__(self, seed=None, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._factors = []
+        self._position = 0
+
+    def _generate(self, n: int) -> np.ndarray:
+        """Log-retornos de los próximos n ticks."""
+        raise NotImplementedError
+
+    def next_price(self, price: float) -> float:
+        """Precio del próximo tick a partir del actual."""
+        if self._position == len(self._factors):
+            self._factors = np.exp(self._generate(self.block_size)).tolist()
+            self._position = 0
+        factor = self._factors[self._position]
+        self._position += 1
+        return price * factor
+
+    def path(self, ticks: int, initial_price: float, floor: float = 1.0) -> np.ndarray:
+        """
+        Trayectoria completa de `ticks` precios, vectorizada (para pruebas de estrés largas).
+        Respeta el piso igual que MarketAgent (el precio nunca baja de `floor`): en escala logarítmica
+        es la recursión de Lindley x_t = max(0, x_{t-1} + r_t), que se resuelve con un mínimo acumulado.
+        Consume el mismo generador que next_price, pero no el bloque ya generado.
+        """
+        returns = self._generate(ticks)
+        cumulative = np.cumsum(returns)
+        start = np.log(initial_price / floor)
+        log_prices = cumulative + np.maximum(start, -np.minimum.accumulate(cumulative))
+        return floor * np.exp(log_prices)
+
+
+class UniformModel(PriceModel):
+    """El modelo original: variación porcentual uniforme entre `low` y `high` por tick."""
+
+    def __init__(self, low: float = -5.0, high: float = 5.0, **kwargs):
+        super().__init__(**kwargs)
+        if not -100 < low <= high:
+            raise ValueError("UniformModel: se requiere -100 < low <= high")
+        self.low = low
+        self.high = high
+
+    def _generate(self, n):
+        return np.log1p(self.rng.uniform(self.low, self.high, n) / 100)
+
+
+class GBMModel(PriceModel):
+    """Movimiento browniano geométrico: deriva `mu` y volatilidad `sigma` por tick."""
+
+    def __init__(self, mu: float = 0.0, sigma: float = 0.02, **kwargs):
+        super().__init__(**kwargs)
+        _check_non_negative(sigma=sigma)
+        self.mu = mu
+        self.sigma = sigma
+
+    def _generate(self, n):
+        return (self.mu - 0.5 * self.sigma ** 2) + self.sigma * self.rng.standard_normal(n)
+
+
+class GARCHModel(PriceModel):
+    """
+    Volatilidad GARCH(1,1): s2_t = omega + alpha * e_{t-1}^2 + beta * s2_{t-1}, con e_t = s_t * z_t.
+    Por defecto la volatilidad de largo plazo es de 2% por tick.
+    """
+
+    # Largo de los tramos en que se resuelve la recursión (acota el rango de los logaritmos acumulados)
+    CHUNK = 128
+
+    def __init__(self, mu: float = 0.0, omega: float = 2e-5, alpha: float = 0.1, beta: float = 0.85, **kwargs):
+        super().__init__(**kwargs)
+        if omega <= 0:
+            raise ValueError("GARCH: omega debe ser mayor que 0")
+        _check_non_negative(alpha=alpha, beta=beta)
+        if alpha + beta >= 1:
+            raise ValueError("GARCH no estacionario: alpha + beta debe ser menor que 1")
+        self.mu = mu
+        self.omega = omega
+        self.alpha = alpha
+        self.beta = beta
+        self._variance = omega / (1 - alpha - beta)  # arranca en la varianza de largo plazo
+        self._last_shock2 = self._variance
+
+    def _generate(self, n):
+        z = self.rng.standard_normal(n)
+        variance = np.empty(n)
+        # s2_t = omega + alpha * s2_{t-1} * z_{t-1}^2 + beta * s2_{t-1} es lineal en s2: s2_t = a_t * s2_{t-1} + omega.
+        # El primer tick depende del último shock del bloque anterior.
+        first = self.omega + self.alpha * self._last_shock2 + self.beta * self._variance
+        # Con alpha y beta chicos el producto de los a_t se va a 0 en pocos ticks: se trabaja en escala
+        # logarítmica (a_t se acota en el menor float positivo para que su logaritmo sea finito)
+        log_a = np.log(np.maximum(self.alpha * z[:-1] ** 2 + self.beta, np.finfo(float).tiny))
+        log_omega = math.log(self.omega)
+        previous = first
+        variance[0] = first
+        # Dentro de cada tramo: s2_t = P_t * (s2_0 + omega * sum(1 / P_k)), con P el producto acumulado
+        # de a; log(s2_0 + omega * sum(1 / P_k)) sale de un logaddexp acumulado
+        for start in range(1, n, self.CHUNK):
+            stop = min(start + self.CHUNK, n)
+            log_products = np.cumsum(log_a[start - 1:stop - 1])
+            log_sums = np.logaddexp.accumulate(np.concatenate(([math.log(previous)], log_omega - log_products)))
+            variance[start:stop] = np.exp(log_products + log_sums[1:])
+            previous = variance[stop - 1]
+        if not np.isfinite(variance).all():
+            raise ValueError("GARCH: la varianza condicional dejó de ser finita (revisar omega, alpha y beta)")
+
+        shocks = np.sqrt(variance) * z
+        self._variance = variance[-1]
+        self._last_shock2 = shocks[-1] ** 2
+        return self.mu - 0.5 * variance + shocks
+
+
+class JumpDiffusionModel(PriceModel):
+    """
+    Difusión con saltos de Merton: browniano geométrico más saltos de Poisson (intensidad `jump_rate`
+    por tick) con tamaño log-normal de media `jump_mean` y desvío `jump_std`.
+    """
+
+    def __init__(self, mu: float = 0.0, sigma: float = 0.02, jump_rate: float = 0.01,
+                 jump_mean: float = -0.05, jump_std: float = 0.1, **kwargs):
+        super().__init__(**kwargs)
+        _check_non_negative(sigma=sigma, jump_rate=jump_rate, jump_std=jump_std)
+        self.mu = mu
+        self.sigma = sigma
+        self.jump_rate = jump_rate
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+
+    def _generate(self, n):
+        diffusion = (self.mu - 0.5 * self.sigma ** 2) + self.sigma * self.rng.standard_normal(n)
+        jumps = self.rng.poisson(self.jump_rate, n)
+        # La suma de k saltos normales es normal con media k * jump_mean y desvío sqrt(k) * jump_std
+        jump_sizes = jumps * self.jump_mean + np.sqrt(jumps) * self.jump_std * self.rng.standard_normal(n)
+        return diffusion + jump_sizes
+
+
+class ReplayModel(PriceModel):
+    """
+    Repite los retornos de una serie histórica en CSV (columna `column`, por defecto "close").
+    Con initial_price igual al primer precio de la serie se reproducen los precios originales.
+    Al terminarse la serie el precio queda constante, salvo con loop=True.
+    """
+
+    def __init__(self, path: str, column: str = 'close', loop: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.column = column
+        self.loop = loop
+        prices = load_price_series(path, column)
+        self.returns = np.diff(np.log(prices))
+        self._cursor = 0
+
+    def _generate(self, n):
+        out = np.zeros(n)
+        filled = 0
+        while filled < n and self.returns.size:
+            if self._cursor == self.returns.size:
+                if not self.loop:
+                    break
+                self._cursor = 0
+            chunk = self.returns[self._cursor:self._cursor + n - filled]
+            out[filled:filled + chunk.size] = chunk
+            filled += chunk.size
+            self._cursor += chunk.size
+        return out
+
+
+def load_price_series(path: str, column: str = 'close') -> np.ndarray:
+    """Lee una columna de precios de un CSV con encabezado (sin distinguir mayúsculas)."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        if column.lower() not in header:
+            raise ValueError(f"{path} no tiene la columna '{column}' (columnas: {', '.join(header)})")
+        index = header.index(column.lower())
+        prices = np.array([float(row[index]) for row in reader if row and row[index].strip()])
+    if prices.size < 2 or (prices <= 0).any():
+        raise ValueError(f"{path}: la serie necesita al menos dos precios positivos")
+    return prices
+
+
+PRICE_MODELS = {
+    'uniform': UniformModel,
+    'gbm': GBMModel,
+    'garch': GARCHModel,
+    'jump': JumpDiffusionModel,
+    'replay': ReplayModel,
+}
+
+
+def build_price_model(spec: Optional[dict], seed=None, allow_files: bool = True) -> Optional[PriceModel]:
+    """
+    Crea un modelo a partir de su especificación, p. ej. {"type": "gbm", "sigma": 0.01}.
+    Sin especificación retorna None (el mercado usa su fluctuación uniforme original).
+    Con allow_files=False se rechaza "replay" (la API web no lee archivos del servidor).
+    """
+    if not spec:
+        return None
+    params = dict(spec)
+    kind = params.pop('type', None)
+    if kind not in PRICE_MODELS:
+        raise ValueError(f"Modelo de precio desconocido: {kind!r} (opciones: {', '.join(PRICE_MODELS)})")
+    if kind == 'replay' and not allow_files:
+        raise ValueError("El modelo 'replay' no está disponible desde la API web")
+    model_class = PRICE_MODELS[kind]
+    accepted = _model_parameters(model_class)
+    if 'seed' in params:
+        raise ValueError("La semilla del modelo es la de la corrida: 'seed' no va en price_model")
+    unknown = set(params) - set(accepted)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos para el modelo {kind!r}: {', '.join(sorted(unknown))} "
+                         f"(opciones: {', '.join(name for name in accepted if name != 'seed')})")
+    missing = [name for name, parameter in accepted.items()
+               if parameter.default is inspect.Parameter.empty and name not in params]
+    if missing:
+        raise ValueError(f"Faltan parámetros para el modelo {kind!r}: {', '.join(missing)}")
+    for name, value in params.items():
+        # Los parámetros numéricos son los que tienen un float por defecto (mu, sigma, omega, ...)
+        if isinstance(accepted[name].default, float) and (
+                isinstance(value, bool) or not isinstance(value, Real) or not math.isfinite(value)):
+            raise ValueError(f"El parámetro {name!r} del modelo {kind!r} debe ser un número finito")
+    block_size = params.get('block_size', DEFAULT_BLOCK_SIZE)
+    if not isinstance(block_size, int) or block_size < 1:
+        raise ValueError("block_size debe ser un entero positivo")
+    if not allow_files and block_size > MAX_WEB_BLOCK_SIZE:
+        raise ValueError(f"block_size no puede superar {MAX_WEB_BLOCK_SIZE} desde la API web")
+    return model_class(seed=seed, **params)
+
+
+def _check_non_negative(**values):
+    for name, value in values.items():
+        if value < 0:
+            raise ValueError(f"{name} no puede ser negativo")
+
+
+def _model_parameters(model_class) -> dict:
+    """Parámetros con nombre que acepta un modelo: los de su __init__ y los que pasa a sus bases por **kwargs."""
+    accepted = {}
+    for klass in model_class.__mro__:
+        if '__init__' not in vars(klass) or klass is object:
+            continue
+        signature = inspect.signature(klass.__init__)
+        for name, parameter in signature.parameters.items():
+            if name != 'self' and parameter.kind not in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                accepted.setdefault(name, parameter)
+        if not any(parameter.kind == parameter.VAR_KEYWORD for parameter in signature.parameters.values()):
+            break
+    return accepted
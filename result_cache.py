@@ -0,0 +1,204 @@
+# result_cache.py
+"""
+    Caché de resultados de simulaciones con semilla: la misma semilla, el mismo escenario y el mismo
+    código producen siempre el mismo resultado, así que una corrida repetida se devuelve sin simular.
+
+    La clave es un hash del escenario normalizado (semilla, precio inicial, configuración de agentes,
+    modelo de precio...) y de la versión del código (hash de los módulos de la simulación). Cada
+    entrada es el checkpoint de la corrida terminada (ver checkpoint.py), por escenario y cantidad de
+    ciclos. Un pedido de más ciclos que una entrada guardada reanuda el checkpoint en lugar de
+    empezar de cero.
+
+    Dos niveles: un LRU en memoria acotado en bytes y un directorio en disco (también acotado en
+    bytes, se borran primero los menos usados) que sobrevive a los reinicios.
+
+    Los checkpoints son pickles: el directorio tiene que ser privado del usuario. Se crea con modo
+    0700 y, si su dueño o sus permisos no son los esperados, el nivel de disco no se usa.
+"""
+
+import getpass
+import glob
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from checkpoint import dumps_checkpoint, loads_checkpoint
+
+# Un directorio por usuario (el tempdir del sistema es compartido)
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(),
+                                 f"simulador-cache-{os.getuid() if hasattr(os, 'getuid') else getpass.getuser()}")
+HIT = 'hit'
+EXTENDED = 'extended'
+MISS = 'miss'
+
+logger = logging.getLogger(__name__)
+
+
+def private_directory(path: str):
+    """
+    Crea `path` con modo 0700 si no existe y verifica que sea un directorio (no un enlace) del
+    usuario actual sin permisos para otros. Lanza PermissionError si no lo es.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} no es un directorio")
+    if hasattr(os, 'getuid'):
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{path} pertenece a otro usuario")
+        if info.st_mode & 0o077:
+            raise PermissionError(f"{path} tiene permisos para otros usuarios (se requiere 0700)")
+
+
+def code_version(directory: str = None) -> str:
+    """Hash de los módulos Python del simulador: cambiar el código invalida las entradas anteriores."""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ResultCache:
+    """Checkpoints de corridas terminadas por (clave del escenario, ciclos), en memoria y en disco."""
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 64 * 2**20,
+                 max_disk_bytes: int = 512 * 2**20, version: str = None):
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._version = version
+        self._memory = OrderedDict()  # (clave, ciclos) -> bytes del checkpoint
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk = None  # None: el directorio todavía no se verificó
+        self.hits = self.extensions = self.misses = 0
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            self._version = code_version()
+        return self._version
+
+    def key(self, scenario: dict) -> str:
+        """Clave de contenido de un escenario (sin la cantidad de ciclos)."""
+        canonical = json.dumps(scenario, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{self.version}:{canonical}".encode()).hexdigest()
+
+    def lookup(self, key: str, cycles: int) -> Tuple[Optional[object], str]:
+        """
+        Busca la corrida de `cycles` ciclos, o la más larga guardada con menos ciclos.
+        Retorna (WebBoot restaurado, HIT | EXTENDED) o (None, MISS). Con EXTENDED el WebBoot queda en
+        su último ciclo guardado y hay que continuarlo con resume_simulation(cycles).
+        """
+        with self._lock:
+            cached = [c for c in self._cycles(key) if c <= cycles]
+            data = self._read(key, max(cached)) if cached else None
+            if data is None:
+                self.misses += 1
+                return None, MISS
+            if max(cached) == cycles:
+                self.hits += 1
+                status = HIT
+            else:
+                self.extensions += 1
+                status = EXTENDED
+        return loads_checkpoint(data), status
+
+    def store(self, key: str, boot):
+        """Guarda el checkpoint de una corrida terminada (con sus datos) en los dos niveles."""
+        data = dumps_checkpoint(boot, include_data=True)
+        cycles = boot.current_cycle
+        with self._lock:
+            self._remember(key, cycles, data)
+            if not self._disk_enabled():
+                return
+            path = self._path(key, cycles)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def clear(self):
+        """Vacía los dos niveles."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if not self._disk_enabled():
+                return
+            for path in glob.glob(os.path.join(self.directory, '*.ckpt')):
+                os.remove(path)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'extensions': self.extensions, 'misses': self.misses,
+                'memory_entries': len(self._memory), 'memory_bytes': self._memory_bytes}
+
+    def _path(self, key, cycles):
+        return os.path.join(self.directory, f"{key}.{cycles}.ckpt")
+
+    def _disk_enabled(self) -> bool:
+        """True si el directorio es privado (se verifica una vez); si no, el caché queda solo en memoria."""
+        if self._disk is None:
+            try:
+                private_directory(self.directory)
+                self._disk = True
+            except OSError as e:
+                logger.warning("Caché de resultados solo en memoria: %s", e)
+                self._disk = False
+        return self._disk
+
+    def _cycles(self, key):
+        cycles = {c for k, c in self._memory if k == key}
+        if not self._disk_enabled():
+            return cycles
+        for path in glob.glob(os.path.join(self.directory, f"{key}.*.ckpt")):
+            cycles.add(int(os.path.basename(path).split('.')[1]))
+        return cycles
+
+    def _read(self, key, cycles):
+        data = self._memory.get((key, cycles))
+        if data is not None:
+            self._memory.move_to_end((key, cycles))
+            return data
+        if not self._disk_enabled():
+            return None
+        path = self._path(key, cycles)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # la fecha de modificación ordena el LRU del disco
+        except FileNotFoundError:
+            return None
+        self._remember(key, cycles, data)
+        return data
+
+    def _remember(self, key, cycles, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop((key, cycles), None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[(key, cycles)] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith('.ckpt')),
+                         key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_disk_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
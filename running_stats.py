@@ -0,0 +1,150 @@
+# running_stats.py
+"""
+    Estadísticas incrementales de una simulación: se actualizan en O(1) por tick y por transacción
+    dentro del ciclo, en lugar de recorrer el historial completo al final.
+"""
+
+import math
+
+from events import TransactionType
+
+
+class PositionLedger:
+    """Posición de un inversor con costo promedio: PnL realizado y no realizado."""
+    __slots__ = ('position', 'avg_cost', 'realized')
+
+    def __init__(self, position: float = 0.0, avg_cost: float = 0.0):
+        self.position = position
+        self.avg_cost = avg_cost
+        self.realized = 0.0
+
+    def fill(self, signed_quantity: float, price: float):
+        """Aplica una ejecución (cantidad positiva = compra, negativa = venta)."""
+        if signed_quantity == 0:
+            return
+        position = self.position
+        if position == 0 or (position > 0) == (signed_quantity > 0):
+            # Aumenta la posición: se recalcula el costo promedio
+            new_position = position + signed_quantity
+            self.avg_cost = (self.avg_cost * abs(position) + price * abs(signed_quantity)) / abs(new_position)
+            self.position = new_position
+            return
+
+        # Reduce (o da vuelta) la posición: se realiza la ganancia/pérdida de lo cerrado
+        closing = min(abs(signed_quantity), abs(position))
+        self.realized += (price - self.avg_cost) * closing * (1 if position > 0 else -1)
+        self.position = position + signed_quantity
+        if self.position == 0:
+            self.avg_cost = 0.0
+        elif abs(signed_quantity) > closing:
+            self.avg_cost = price  # la posición cambió de signo
+
+    def unrealized(self, price: float) -> float:
+        return (price - self.avg_cost) * self.position
+
+
+class RunningStatistics:
+    """
+    Acumuladores de la corrida: mínimo/máximo/media y varianza de Welford del precio y de los
+    retornos, VWAP, máximo drawdown, cantidad de compras/ventas, volumen negociado y PnL por inversor.
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.initial_price = None
+        self.last_price = None
+        self.max_price = -math.inf
+        self.min_price = math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.returns = 0
+        self._return_mean = 0.0
+        self._return_m2 = 0.0
+        self._peak = -math.inf
+        self.max_drawdown = 0.0
+        self.buys = 0
+        self.sells = 0
+        self._notional = 0.0
+        self._volume = 0.0
+        self.ledgers = {}
+
+    def register_investor(self, investor_id: str, crypto_balance: float, price: float):
+        """Posición inicial del inversor, valuada al precio inicial."""
+        self.ledgers[investor_id] = PositionLedger(crypto_balance, price)
+
+    def update_price(self, price: float):
+        """Actualiza los acumuladores de precio con el precio de cierre de un tick."""
+        if self.last_price is not None:
+            ret = (price - self.last_price) / self.last_price
+            self.returns += 1
+            delta = ret - self._return_mean
+            self._return_mean += delta / self.returns
+            self._return_m2 += delta * (ret - self._return_mean)
+        else:
+            self.initial_price = price
+
+        self.ticks += 1
+        delta = price - self._mean
+        self._mean += delta / self.ticks
+        self._m2 += delta * (price - self._mean)
+
+        self.last_price = price
+        if price > self.max_price:
+            self.max_price = price
+        if price < self.min_price:
+            self.min_price = price
+        if price > self._peak:
+            self._peak = price
+        drawdown = (self._peak - price) / self._peak
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+
+    def add_trade(self, investor_id: str, action: str, price: float, quantity: float = 1.0):
+        """
+        Registra una ejecución confirmada (un INFORM exitoso). Las compras y ventas cuentan
+        ejecuciones; la cantidad negociada se acumula aparte como volumen.
+        """
+        if action == TransactionType.BUY.value:
+            self.buys += 1
+            signed = quantity
+        elif action == TransactionType.SELL.value:
+            self.sells += 1
+            signed = -quantity
+        else:
+            return
+        self._notional += price * quantity
+        self._volume += quantity
+
+        ledger = self.ledgers.get(investor_id)
+        if ledger is None:
+            ledger = self.ledgers[investor_id] = PositionLedger()
+        ledger.fill(signed, price)
+
+    def summary(self, include_pnl: bool = True) -> dict:
+        """Estadísticas finales (mismas claves que usa el frontend, más las nuevas)."""
+        if self.ticks == 0:
+            return {}
+        price_change = self.last_price - self.initial_price
+        summary = {
+            'initial_price': self.initial_price,
+            'final_price': self.last_price,
+            'max_price': self.max_price,
+            'min_price': self.min_price,
+            'price_change': price_change,
+            'price_change_percent': (price_change / self.initial_price) * 100,
+            'total_transactions': self.buys + self.sells,
+            'buy_transactions': self.buys,
+            'sell_transactions': self.sells,
+            'traded_volume': self._volume,
+            'mean_price': self._mean,
+            'price_std': math.sqrt(self._m2 / self.ticks),
+            'volatility': math.sqrt(self._return_m2 / self.returns) if self.returns else 0.0,
+            'vwap': self._notional / self._volume if self._volume else None,
+            'max_drawdown_percent': self.max_drawdown * 100,
+        }
+        if include_pnl:
+            summary['pnl'] = {investor_id: {'position': ledger.position,
+                                            'realized': ledger.realized,
+                                            'unrealized': ledger.unrealized(self.last_price)}
+                              for investor_id, ledger in self.ledgers.items()}
+        return summary
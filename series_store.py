@@ -0,0 +1,263 @@
+# series_store.py
+"""
+    Almacén en disco de las series de precios de las corridas terminadas, para graficarlas por rangos.
+    Cada corrida guarda su serie completa y una pirámide de resoluciones: en el nivel k cada bucket
+    resume `factor`^k ticks con su mínimo y su máximo (y la posición de cada uno). Los archivos se
+    abren con memory-map, así una consulta lee solo las páginas del rango pedido.
+
+    Una consulta (from, to, max_points) elige el nivel más grueso cuyos buckets no superan el ancho
+    de los buckets de salida y agrupa esos buckets: el costo depende de max_points, no del largo del
+    rango. Métodos de reducción:
+        minmax  el mínimo y el máximo de cada bucket, en orden (conserva picos y caídas)
+        lttb    Largest-Triangle-Three-Buckets sobre los candidatos de minmax (MinMaxLTTB)
+"""
+
+import getpass
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from result_cache import private_directory
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(),
+                                 f"simulador-series-{os.getuid() if hasattr(os, 'getuid') else getpass.getuser()}")
+DEFAULT_FACTOR = 8
+MIN_LEVEL_SIZE = 64  # no se construyen niveles con menos buckets que esto
+LTTB_OVERSAMPLING = 4  # candidatos de minmax por punto de salida en lttb
+DOWNSAMPLE_METHODS = ('minmax', 'lttb')
+
+_RUN_ID = re.compile(r'^[0-9a-f]{1,64}$')
+
+
+class StoredSeries:
+    """Serie de una corrida abierta con memory-map: precios crudos y niveles de la pirámide."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.factor = meta['factor']
+        self.prices = np.load(os.path.join(path, 'prices.npy'), mmap_mode='r')
+        # Nivel k (k >= 1): filas mínimo, posición del mínimo, máximo, posición del máximo
+        self.levels = [np.load(os.path.join(path, f'level_{k}.npy'), mmap_mode='r')
+                       for k in range(1, meta['levels'] + 1)]
+
+    def __len__(self):
+        return len(self.prices)
+
+    def range(self, start: int = 0, stop: int = None, max_points: int = 1000, method: str = 'minmax') -> dict:
+        """
+        Puntos (x = ciclo, y = precio) del rango [start, stop) reducidos a lo sumo a max_points.
+        Si el rango tiene max_points precios o menos se devuelven todos, sin reducir.
+        """
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Método de reducción desconocido: {method!r} (opciones: {', '.join(DOWNSAMPLE_METHODS)})")
+        if max_points < 4:
+            raise ValueError("max_points debe ser al menos 4")
+        n = len(self.prices)
+        stop = n if stop is None else min(stop, n)
+        start = max(0, start)
+        if start >= stop:
+            return {'from': start, 'to': max(start, stop), 'level': 0, 'x': [], 'y': []}
+
+        if stop - start <= max_points:
+            x = np.arange(start, stop)
+            y = np.asarray(self.prices[start:stop])
+            level = 0
+        elif method == 'minmax':
+            x, y, level = self._minmax(start, stop, max_points // 2)
+        else:
+            x, y, level = self._minmax(start, stop, max_points * LTTB_OVERSAMPLING // 2)
+            x, y = _lttb(x, y, max_points)
+        return {'from': start, 'to': stop, 'level': level, 'x': x.tolist(), 'y': y.tolist()}
+
+    def _minmax(self, start, stop, buckets):
+        # Nivel más grueso cuyos buckets entran en los de salida; los extremos del rango que no
+        # llenan un bucket del nivel se resumen desde los precios crudos (son menos de un bucket).
+        interior = max(1, buckets - 2)
+        width = (stop - start) / interior
+        level = 0
+        while level < len(self.levels) and self.factor ** (level + 1) <= width:
+            level += 1
+        size = self.factor ** level
+        first = -(-start // size)
+        last = max(first, stop // size)
+
+        groups = []
+        if start < first * size:
+            groups.append(self._raw_group(start, min(first * size, stop)))
+        if first < last:
+            mins, min_pos, maxs, max_pos = self._level_slice(level, first, last)
+            groups.append(_group_extremes(mins, min_pos, maxs, max_pos, -(-(last - first) // interior)))
+        if last * size < stop and last * size >= start:
+            groups.append(self._raw_group(max(last * size, start), stop))
+        x = np.concatenate([group[0] for group in groups])
+        y = np.concatenate([group[1] for group in groups])
+        return x, y, level
+
+    def _raw_group(self, start, stop):
+        prices = np.asarray(self.prices[start:stop])
+        positions = np.arange(start, stop, dtype=np.float64)
+        return _group_extremes(prices, positions, prices, positions, len(prices))
+
+    def _level_slice(self, level, first, last):
+        if level == 0:
+            prices = np.asarray(self.prices[first:last])
+            positions = np.arange(first, last, dtype=np.float64)
+            return prices, positions, prices, positions
+        data = self.levels[level - 1]
+        return (np.asarray(data[0, first:last]), np.asarray(data[1, first:last]),
+                np.asarray(data[2, first:last]), np.asarray(data[3, first:last]))
+
+
+class SeriesStore:
+    """
+    Directorio con las series de las últimas `max_runs` corridas (se borran las más viejas).
+    Las series abiertas se mantienen en un LRU de `max_open` entradas. El directorio debe ser privado
+    del usuario (0700, ver result_cache.private_directory): si no lo es, save y get lanzan PermissionError.
+    """
+
+    def __init__(self, directory: str = None, max_runs: int = 32, max_open: int = 8,
+                 factor: int = DEFAULT_FACTOR):
+        if factor < 2:
+            raise ValueError("El factor de la pirámide debe ser al menos 2")
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.max_runs = max_runs
+        self.max_open = max_open
+        self.factor = factor
+        self._open = OrderedDict()  # run_id -> StoredSeries
+        self._lock = threading.Lock()
+        self._private = False  # el directorio se verifica una vez, en el primer save o get
+
+    def _check_directory(self):
+        if not self._private:
+            private_directory(self.directory)
+            self._private = True
+
+    def _path(self, run_id: str) -> str:
+        if not _RUN_ID.match(run_id):
+            raise ValueError(f"Id de corrida inválido: {run_id!r}")
+        return os.path.join(self.directory, run_id)
+
+    def save(self, run_id: str, prices) -> str:
+        """Guarda la serie de una corrida con su pirámide. La escritura es atómica (directorio temporal + rename)."""
+        path = self._path(run_id)
+        self._check_directory()
+        prices = np.asarray(prices, dtype=np.float64)
+        levels = build_pyramid(prices, self.factor)
+
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            np.save(os.path.join(staging, 'prices.npy'), prices)
+            for k, level in enumerate(levels, start=1):
+                np.save(os.path.join(staging, f'level_{k}.npy'), level)
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump({'length': len(prices), 'factor': self.factor, 'levels': len(levels)}, f)
+            with self._lock:
+                self._open.pop(run_id, None)
+                if os.path.exists(path):
+                    shutil.rmtree(path)
+                os.rename(staging, path)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._evict()
+        return run_id
+
+    def get(self, run_id: str):
+        """Serie guardada de una corrida (None si no existe)."""
+        path = self._path(run_id)
+        self._check_directory()
+        with self._lock:
+            series = self._open.get(run_id)
+            if series is not None:
+                self._open.move_to_end(run_id)
+                return series
+            if not os.path.exists(os.path.join(path, 'meta.json')):
+                return None
+            series = self._open[run_id] = StoredSeries(path)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+            return series
+
+    def run_ids(self) -> list:
+        """Ids de las corridas guardadas, de la más vieja a la más nueva."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_dir() and _RUN_ID.match(entry.name)]
+        return [entry.name for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime)]
+
+    def _evict(self):
+        run_ids = self.run_ids()
+        for run_id in run_ids[:max(0, len(run_ids) - self.max_runs)]:
+            with self._lock:
+                self._open.pop(run_id, None)
+            shutil.rmtree(os.path.join(self.directory, run_id), ignore_errors=True)
+
+
+def build_pyramid(prices: np.ndarray, factor: int = DEFAULT_FACTOR) -> list:
+    """
+    Niveles de la pirámide: cada uno es un arreglo (4, m) con el mínimo, su posición, el máximo y su
+    posición por bucket de factor^k ticks. Cada nivel se calcula desde el anterior.
+    """
+    levels = []
+    mins = maxs = prices
+    min_pos = max_pos = np.arange(len(prices), dtype=np.float64)
+    while -(-len(mins) // factor) >= MIN_LEVEL_SIZE:
+        mins, min_pos, maxs, max_pos = _reduce(mins, min_pos, maxs, max_pos, factor)
+        levels.append(np.vstack([mins, min_pos, maxs, max_pos]))
+    return levels
+
+
+def _reduce(mins, min_pos, maxs, max_pos, group):
+    """Agrupa de a `group` buckets: mínimo y máximo de cada grupo con sus posiciones."""
+    rows = -(-len(mins) // group)
+    pad = rows * group - len(mins)
+    mins = np.pad(mins, (0, pad), constant_values=np.inf).reshape(rows, group)
+    maxs = np.pad(maxs, (0, pad), constant_values=-np.inf).reshape(rows, group)
+    min_pos = np.pad(min_pos, (0, pad)).reshape(rows, group)
+    max_pos = np.pad(max_pos, (0, pad)).reshape(rows, group)
+    i = np.argmin(mins, axis=1)[:, None]
+    j = np.argmax(maxs, axis=1)[:, None]
+    return (np.take_along_axis(mins, i, 1)[:, 0], np.take_along_axis(min_pos, i, 1)[:, 0],
+            np.take_along_axis(maxs, j, 1)[:, 0], np.take_along_axis(max_pos, j, 1)[:, 0])
+
+
+def _group_extremes(mins, min_pos, maxs, max_pos, group):
+    """Puntos minmax: por cada grupo, el mínimo y el máximo en orden de posición (uno solo si coinciden)."""
+    mins, min_pos, maxs, max_pos = _reduce(mins, min_pos, maxs, max_pos, group)
+    min_first = min_pos <= max_pos
+    x = np.column_stack([np.where(min_first, min_pos, max_pos), np.where(min_first, max_pos, min_pos)])
+    y = np.column_stack([np.where(min_first, mins, maxs), np.where(min_first, maxs, mins)])
+    keep = np.ones(x.shape, dtype=bool)
+    keep[:, 1] = x[:, 0] != x[:, 1]
+    return x[keep].astype(np.int64), y[keep]
+
+
+def _lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: conserva el primer y el último punto y uno por bucket intermedio."""
+    n = len(x)
+    if n <= threshold:
+        return x, y
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Promedio del bucket siguiente (o el último punto)
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = xf[next_lo:next_hi].mean() if next_hi > next_lo else xf[-1]
+        avg_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        ax, ay = xf[previous], y[previous]
+        areas = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - xf[lo:hi]) * (avg_y - ay))
+        previous = lo + int(np.argmax(areas))
+        selected[b + 1] = previous
+    return x[selected], y[selected]
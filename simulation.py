@@ -0,0 +1,359 @@
+# simulation.py
+"""
+    Núcleo de la simulación sin dependencias web: WebBoot (el mercado, sus inversores y el
+    dispatcher) y la creación de un simulador a partir de los parámetros de una corrida.
+    Lo usan la API (app.py), el modo batch (cli.py), los barridos, los checkpoints y los mercados
+    múltiples.
+
+    Solo se importa lo que usa la corrida: numpy, la población vectorizada y los modelos de precio
+    se cargan recién cuando el escenario los pide (population_size > 0, price_model).
+"""
+
+import random
+import time
+
+from agents import MarketAgent, BatchMarketAgent, InvestorAgent
+from events import FipaPerformative
+from message_dispatcher import MessageDispatcher
+from skills import InvestmentSkill
+from metrics import SimulationProfiler, REGISTRY
+from running_stats import RunningStatistics
+from state_recorder import StateRecorder
+from tracing import TRACER
+
+
+class WebBoot:
+    """Boot que captura datos para la web."""
+    def __init__(self, profile: bool = False, snapshot_every: int = 50, sample_every: int = 1,
+                 keep_history: bool = True):
+        self.agents = {}
+        self.market = None
+        self.dispatcher = MessageDispatcher()
+        self.dispatcher.add_listener(FipaPerformative.INFORM, self._record_transaction)
+        # Instrumentación opcional por fase (ver metrics.py); desactivada no agrega costo por mensaje
+        self.profiler = SimulationProfiler() if profile else None
+        if self.profiler is not None:
+            self.dispatcher.message_counts = self.profiler.messages
+        self._cycle_transactions = []
+        self.current_cycle = 0
+        self.stats = RunningStatistics()  # estadísticas incrementales de la corrida
+        # Estados de los agentes: snapshot cada snapshot_every muestras y deltas de los que cambiaron
+        # (sin keep_history, en streaming, solo el último snapshot)
+        self.recorder = StateRecorder(snapshot_every, sample_every, keep_history)
+        self._changed_agents = set()  # receptores de INFORM desde la última muestra
+        self.simulation_data = {
+            'price_history': [],
+            'cycles': [],
+            'transactions': [],
+            'agent_states': None,
+            'logs': []
+        }
+    
+    def initialize_agents(self, initial_price=100.0, population_size=0, use_order_book=False,
+                          seed=None, risk_mix=None, price_model=None, skill_class=InvestmentSkill,
+                          batch_cnp=False, market_id="Mercado01"):
+        """Crea los agentes e inicializa el sistema.
+        Si population_size > 0 se agrega una poblacion vectorizada de inversores (modo poblacion).
+        Con use_order_book el mercado ejecuta las transacciones en un libro de ordenes limite.
+        Con seed la corrida es reproducible.
+        risk_mix reemplaza a los tres inversores por defecto con un inversor por tolerancia al riesgo.
+        price_model (ver price_models.py) reemplaza la fluctuación uniforme del mercado.
+        skill_class es la habilidad de decisión de los inversores (p. ej. TrendInvestmentSkill).
+        Con batch_cnp el mercado responde los CFP y confirma las transacciones con mensajes multicast.
+        market_id es el id del mercado (varios mercados a la vez: ver markets.py)."""
+        self.dispatcher.clear_queue()
+        
+        # Un mercado por WebBoot (varios mercados en paralelo: ver markets.py)
+        # Cada simulación tiene su propio generador (sin semilla se inicializa con entropía del sistema)
+        rng = random.Random(seed)
+        market_class = BatchMarketAgent if batch_cnp else MarketAgent
+        self.market = market_class(market_id, initial_price=initial_price, use_order_book=use_order_book, rng=rng,
+                                  price_model=price_model)
+        self.agents[self.market.id] = self.market
+        self.dispatcher.register_agent(self.market.id, self.market)
+        self.market.initialize()
+
+        if risk_mix is not None:
+            for i, risk_tolerance in enumerate(risk_mix):
+                investor = InvestorAgent(f"Inversor_{i}", risk_tolerance=risk_tolerance, fiat_balance=500.0, crypto_balance=5.0,
+                                         skill_class=skill_class, market_id=market_id)
+                self.agents[investor.id] = investor
+                self.dispatcher.register_agent(investor.id, investor)
+                investor.initialize()
+        else:
+            self._create_default_investors(skill_class, market_id)
+
+        # Poblacion vectorizada: repite las tres personalidades (racional, impulsivo, medio)
+        if population_size > 0:
+            import numpy as np
+            from population import InvestorPopulation
+            risk_tolerances = np.resize(np.array([0.1, 0.6, 0.3]), population_size)
+            population = InvestorPopulation("Poblacion01", risk_tolerance=risk_tolerances,
+                                            fiat_balance=500.0, crypto_balance=5.0, market_id=market_id)
+            self.agents[population.id] = population
+            self.dispatcher.register_agent(population.id, population)
+            population.initialize()
+        
+        # Configurar los agentes para usar el dispatcher y los indicadores del mercado, y registrar sus posiciones iniciales
+        for agent in self.agents.values():
+            agent.comms.set_dispatcher(self.dispatcher)
+            if isinstance(agent, InvestorAgent):
+                agent.attach_indicators(self.market.indicators)
+                self.stats.register_investor(agent.id, agent.crypto_balance, initial_price)
+            elif agent.IS_POPULATION:
+                self.stats.register_investor(agent.id, float(agent.crypto_balance.sum()), initial_price)
+        
+        # Aqui guardo el estado inicial de los agentes antes de comenzar la simulación.
+        self._capture_agent_states(0)
+
+    def _create_default_investors(self, skill_class=InvestmentSkill, market_id="Mercado01"):
+        """Agentes Inversores con diferentes personalidades."""
+        inv_racional = InvestorAgent("InversorRacional_A1", risk_tolerance=0.1, fiat_balance=500.0, crypto_balance=5.0, skill_class=skill_class, market_id=market_id)
+        self.agents[inv_racional.id] = inv_racional
+        self.dispatcher.register_agent(inv_racional.id, inv_racional)
+        inv_racional.initialize()
+
+        inv_impulsivo = InvestorAgent("InversorImpulsivo_B", risk_tolerance=0.6, fiat_balance=500.0, crypto_balance=5.0, skill_class=skill_class, market_id=market_id)
+        self.agents[inv_impulsivo.id] = inv_impulsivo
+        self.dispatcher.register_agent(inv_impulsivo.id, inv_impulsivo)
+        inv_impulsivo.initialize()
+        
+        inv_medio = InvestorAgent("InversorMedio_C", risk_tolerance=0.3, fiat_balance=500.0, crypto_balance=5.0, skill_class=skill_class, market_id=market_id)
+        self.agents[inv_medio.id] = inv_medio
+        self.dispatcher.register_agent(inv_medio.id, inv_medio)
+        inv_medio.initialize()
+    
+    def _capture_agent_states(self, cycle):
+        """Captura el estado de todos los agentes."""
+        self.recorder.add_snapshot(self._snapshot_agent_states(cycle))
+        self._changed_agents.clear()
+        self.simulation_data['price_history'].append(self.market.current_price)
+
+    def _snapshot_agent_states(self, cycle):
+        """Arma el estado de todos los agentes en el ciclo dado."""
+        states = {
+            'cycle': cycle,
+            'market_price': self.market.current_price,
+            'investors': {}
+        }
+        
+        for agent_id, agent in self.agents.items():
+            if isinstance(agent, InvestorAgent):
+                states['investors'][agent_id] = self._investor_state(agent)
+            elif agent.IS_POPULATION:
+                states.setdefault('populations', {})[agent_id] = agent.summary()
+
+        return states
+
+    def current_state(self):
+        """Estado completo de los agentes en el ciclo actual, tomado de los agentes (no del registro)."""
+        return self._snapshot_agent_states(self.current_cycle)
+
+    @staticmethod
+    def _investor_state(agent):
+        return {
+            'fiat_balance': round(agent.fiat_balance, 2),
+            'crypto_balance': round(agent.crypto_balance, 2),
+            'risk_tolerance': agent.risk_tolerance
+        }
+
+    def _delta_agent_states(self, cycle):
+        """Estado de los agentes que recibieron un INFORM desde la última muestra (los únicos que pueden cambiar)."""
+        delta = {
+            'cycle': cycle,
+            'market_price': self.market.current_price,
+            'investors': {},
+            'delta': True
+        }
+        for agent_id in self._changed_agents:
+            agent = self.agents.get(agent_id)
+            if isinstance(agent, InvestorAgent):
+                delta['investors'][agent_id] = self._investor_state(agent)
+            elif getattr(agent, 'IS_POPULATION', False):
+                delta.setdefault('populations', {})[agent_id] = agent.summary()
+        return delta
+
+    def _record_agent_states(self, cycle):
+        """
+        Registra el estado del ciclo si corresponde muestrearlo: snapshot completo o delta.
+        Retorna lo registrado (None si el ciclo no se muestrea).
+        """
+        if not self.recorder.should_sample(cycle):
+            return None
+        if self.recorder.needs_snapshot():
+            state = self._snapshot_agent_states(cycle)
+            self.recorder.add_snapshot(state)
+        else:
+            state = self._delta_agent_states(cycle)
+            self.recorder.add_delta(state)
+        self._changed_agents.clear()
+        return state
+    
+    def _dispatch_messages(self, max_iterations=10):
+        """Procesa los mensajes de la cola usando el MessageDispatcher."""
+        # La captura de transacciones se hace con un observador de INFORM registrado en el dispatcher
+        return self.dispatcher.dispatch(max_iterations)
+
+    def _record_transaction(self, event):
+        """Observador de INFORM: captura las transacciones exitosas antes de entregarlas."""
+        fills = event.content.get("fills")
+        if fills is None:
+            self._record_fill(event.sender, event.receiver, event.content)
+            return
+        # INFORM en lote: un resultado por inversor (ver BatchMarketAgent)
+        for receiver, receiver_fills in fills.items():
+            for fill in receiver_fills:
+                self._record_fill(event.sender, receiver, fill)
+
+    def _record_fill(self, sender, receiver, content):
+        self._changed_agents.add(receiver)
+        if content.get("status") == "success":
+            action = content.get("action")
+            price = content.get("price")
+            count = content.get("count", 1)
+            self._cycle_transactions.append({
+                'cycle': self.current_cycle,
+                'sender': sender,
+                'receiver': receiver,
+                'action': action,
+                'price': price,
+                'count': count
+            })
+            self.stats.add_trade(receiver, action, price, count)
+    
+    def run_simulation(self, cycles: int = 5, checkpoint_every: int = 0, checkpoint_path: str = None):
+        """Ejecuta la simulación y captura datos.
+        Con checkpoint_every > 0 guarda un checkpoint en checkpoint_path cada esa cantidad de ciclos."""
+        self.reset_simulation_data()
+        return self.resume_simulation(cycles, checkpoint_every, checkpoint_path)
+
+    def reset_simulation_data(self):
+        """Descarta los datos capturados y vuelve al ciclo 0 (los agentes conservan su estado)."""
+        self.simulation_data = {
+            'price_history': [],
+            'cycles': [],
+            'transactions': [],
+            'agent_states': None,
+            'logs': []
+        }
+        self.current_cycle = 0
+        self.recorder.clear()
+        if self.market is not None:
+            self.recorder.add_snapshot(self._snapshot_agent_states(0))  # estado de partida
+            self._changed_agents.clear()
+
+    def resume_simulation(self, cycles: int, checkpoint_every: int = 0, checkpoint_path: str = None):
+        """Continúa la simulación desde el ciclo actual (por ejemplo, tras load_checkpoint) hasta `cycles`."""
+        if checkpoint_every:
+            from checkpoint import save_checkpoint
+        for record in self.iter_simulation(cycles):
+            self.simulation_data['price_history'].append(record['price'])
+            self.simulation_data['transactions'].extend(record['transactions'])
+            if checkpoint_every and record['cycle'] % checkpoint_every == 0:
+                save_checkpoint(self, checkpoint_path)
+        
+        # Snapshots y deltas (ver StateRecorder); recorder.state_at(ciclo) reconstruye un ciclo completo
+        self.simulation_data['agent_states'] = self.recorder.to_dict()
+        return self.simulation_data
+
+    def iter_simulation(self, cycles: int = 5):
+        """
+        Ejecuta la simulación como generador: produce un registro por ciclo
+        (precio, estado de los agentes y transacciones del ciclo) sin acumular resultados.
+        El estado es lo que registró el recorder en ese ciclo: snapshot, delta o None si no se muestreó.
+        Arranca en el ciclo siguiente al actual y termina en el ciclo `cycles`.
+        """
+        profiler = self.profiler
+        for t in range(self.current_cycle + 1, cycles + 1):
+            self.current_cycle = t
+            TRACER.tick = t
+            self._cycle_transactions = []
+            if profiler is not None:
+                profiler.start_tick()
+                started = time.perf_counter()
+            
+            # 1. El mercado actualiza el precio
+            self.market.run_cycle(t)
+            if profiler is not None:
+                now = time.perf_counter()
+                profiler.add_phase('market', now - started)
+                started = now
+            
+            # 2. Los inversores toman decisiones
+            for agent in self.agents.values():
+                if isinstance(agent, InvestorAgent) or agent.IS_POPULATION:
+                    agent.run_cycle(t, self.market.price_history)
+            if profiler is not None:
+                now = time.perf_counter()
+                profiler.add_phase('decisions', now - started)
+                profiler.observe_queue(self.dispatcher.get_queue_size())
+                started = now
+            
+            # 3. Despacho de Mensajes (itera hasta procesar todos)
+            self._dispatch_messages()
+
+            # 3b. Con libro de ordenes: matching en bloque de las ordenes del tick y entrega de los INFORM
+            if self.market.order_book is not None:
+                self.market.match_orders()
+                self._dispatch_messages()
+            if profiler is not None:
+                now = time.perf_counter()
+                profiler.add_phase('dispatch', now - started)
+                started = now
+            
+            # 4. Capturar estado del ciclo
+            self.stats.update_price(self.market.current_price)
+            agent_state = self._record_agent_states(t)
+            if profiler is not None:
+                profiler.add_phase('capture', time.perf_counter() - started)
+                profiler.end_tick(self.dispatcher)
+
+            yield {
+                'cycle': t,
+                'price': self.market.current_price,
+                'agent_state': agent_state,
+                'transactions': self._cycle_transactions
+            }
+
+        if profiler is not None:
+            REGISTRY.record(profiler)
+        TRACER.flush()
+
+
+def scenario_params(data):
+    """Parámetros que definen una corrida (todos salvo la cantidad de ciclos), con sus valores por defecto."""
+    return {
+        'profile': data.get('profile', False),
+        'snapshot_every': data.get('snapshot_every', 50),
+        'sample_every': data.get('sample_every', 1),
+        'initial_price': data.get('initial_price', 100.0),
+        'population_size': data.get('population_size', 0),
+        'order_book': data.get('order_book', False),
+        'seed': data.get('seed'),
+        'batch_cnp': data.get('batch_cnp', False),
+        'price_model': data.get('price_model'),
+    }
+
+
+def create_simulator(data, allow_files=True, keep_history=True):
+    """
+    Crea e inicializa un WebBoot con los parámetros de una corrida (ver scenario_params).
+    Con keep_history=False el registro de estados no guarda historial (corridas en streaming).
+    """
+    params = scenario_params(data)
+    simulator = WebBoot(profile=params['profile'],
+                        snapshot_every=params['snapshot_every'],
+                        sample_every=params['sample_every'],
+                        keep_history=keep_history)
+    seed = params['seed']
+    price_model = None
+    if params['price_model']:
+        from price_models import build_price_model
+        price_model = build_price_model(params['price_model'], seed, allow_files=allow_files)
+    simulator.initialize_agents(initial_price=params['initial_price'],
+                                population_size=params['population_size'],
+                                use_order_book=params['order_book'],
+                                seed=seed,
+                                batch_cnp=params['batch_cnp'],
+                                price_model=price_model)
+    return simulator
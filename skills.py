@@ -4,10 +4,22 @@
 """
 
 from events import TransactionType
-from typing import Any
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np  # las versiones vectorizadas lo importan al usarse (arranque sin numpy)
+
+# Codigos de accion usados por la poblacion vectorizada (ver population.py)
+ACTION_NONE = 0
+ACTION_BUY = 1
+ACTION_SELL = 2
 
 class InvestmentSkill:
     """Habilidad para tomar decisiones de inversión basadas en personalidad y precio."""
+
+    # Indicadores que usa la habilidad: (nombre, ventana[, parámetros]), ver indicators.py.
+    # El mercado los calcula una vez por tick y los comparte entre todos los inversores.
+    INDICATORS = ()
     
     def __init__(self, risk_tolerance: float):
         # 0.1 para el racional, 0.5 o mas para el impulsivo
@@ -15,11 +27,12 @@ class InvestmentSkill:
         self.MIN_PROFIT_BUY = 0.01 # represneta la "Señal Compra" en el diagrama de Ontologías
         self.MAX_LOSS_SELL = 0.05 # represneta la "Señal Venta" en el diagrama de Ontologías
     
-    def decide_transaction(self, price_change: float) -> Any:
+    def decide_transaction(self, price_change: float, indicators=None) -> Any:
         """
         Aca puede decidir entre: COMPRAR, VENDER o NO HACER NADA. 
         Retorna la acción y la cantidad. Es una version simplificada: 1.0 unidad de cripto).
         Al final no tomé los saldos como variable que influye en la decision. Decidí simplificarlo.
+        indicators es el IndicatorService del mercado (esta habilidad no lo usa).
         """
         action = None
         amount = 1.0
@@ -42,5 +55,91 @@ class InvestmentSkill:
                 action = TransactionType.SELL # Ambos pueden vender, Impulsivo más rápido
 
         # Aqui deberia agregar en un futuro la logica que considere el saldo fiat y saldo cripto del diagrama de ontologia.
-        print(action, amount)
-        return action, amount
\ No newline at end of file
+        return action, amount
+
+
+class TrendInvestmentSkill(InvestmentSkill):
+    """
+    Igual que InvestmentSkill, pero confirma la señal con indicadores: no compra por encima de la
+    banda superior de Bollinger ni con RSI de sobrecompra, y no vende con RSI de sobreventa.
+    """
+
+    INDICATORS = (('rsi', 14), ('bollinger', 20))
+
+    def decide_transaction(self, price_change: float, indicators=None) -> Any:
+        action, amount = super().decide_transaction(price_change)
+        if action is None or indicators is None:
+            return action, amount
+
+        rsi = indicators.get('rsi', 14)
+        bands = indicators.get('bollinger', 20)
+        if action == TransactionType.BUY:
+            if (rsi is not None and rsi > 70) or (bands is not None and indicators.last_price > bands[2]):
+                action = None
+        elif rsi is not None and rsi < 30:
+            action = None
+        return action, amount
+
+
+class BatchInvestmentSkill:
+    """
+    Version vectorizada de InvestmentSkill: decide para todos los inversores de una poblacion
+    en una sola llamada. Aplica exactamente los mismos umbrales (FOMO / panico) que decide_transaction.
+    """
+
+    MIN_PROFIT_BUY = 0.01
+    MAX_LOSS_SELL = 0.05
+
+    def decide_transactions(self, price_change: float, risk_tolerance: 'np.ndarray') -> 'np.ndarray':
+        """
+        Retorna un arreglo int8 con ACTION_NONE, ACTION_BUY o ACTION_SELL por inversor.
+        La cantidad es siempre 1.0 unidad de cripto, igual que en InvestmentSkill.
+        """
+        import numpy as np
+        buy_threshold = 0.02 * (1.0 - risk_tolerance)
+        panic_threshold = 0.05 * risk_tolerance
+
+        buy_zone = price_change > buy_threshold + self.MIN_PROFIT_BUY
+        buy = buy_zone & (((price_change > 0.05) & (risk_tolerance > 0.3)) | (price_change > buy_threshold))
+        sell = ~buy_zone & (price_change < -panic_threshold) & ((price_change < -0.05) | (risk_tolerance > 0.3))
+
+        actions = np.full(risk_tolerance.shape, ACTION_NONE, dtype=np.int8)
+        actions[buy] = ACTION_BUY
+        actions[sell] = ACTION_SELL
+        return actions
+
+
+class TriggerIndex:
+    """
+    Indice ordenado de disparadores para una poblacion con tolerancias al riesgo fijas.
+    Como la decision solo depende de la variacion del precio, cada inversor compra por encima de un
+    umbral y vende por debajo de otro: con los umbrales ordenados, cada tick solo se visitan los
+    inversores cuyos umbrales fueron cruzados (O(log n + k) en lugar de O(n)).
+    Da exactamente el mismo resultado que BatchInvestmentSkill.decide_transactions.
+    """
+
+    def __init__(self, risk_tolerance: 'np.ndarray', skill: BatchInvestmentSkill = None):
+        import numpy as np
+        skill = skill or BatchInvestmentSkill()
+        risk_tolerance = np.asarray(risk_tolerance, dtype=np.float64)
+
+        # Compra si price_change > buy_threshold + MIN_PROFIT_BUY (misma expresion que decide_transactions)
+        self._buy_trigger = 0.02 * (1.0 - risk_tolerance) + skill.MIN_PROFIT_BUY
+        # Vende si price_change < -panic_threshold y (price_change < -0.05 o risk_tolerance > 0.3)
+        panic_threshold = 0.05 * risk_tolerance
+        sell_trigger = np.where(risk_tolerance > 0.3, -panic_threshold, np.minimum(-panic_threshold, -0.05))
+
+        self._buy_order = np.argsort(self._buy_trigger, kind='stable')
+        self._buy_sorted = self._buy_trigger[self._buy_order]
+        self._sell_order = np.argsort(sell_trigger, kind='stable')
+        self._sell_sorted = sell_trigger[self._sell_order]
+
+    def triggered(self, price_change: float):
+        """Retorna (indices que compran, indices que venden), ordenados por indice de inversor."""
+        import numpy as np
+        buys = self._buy_order[:np.searchsorted(self._buy_sorted, price_change, side='left')]
+        sells = self._sell_order[np.searchsorted(self._sell_sorted, price_change, side='right'):]
+        if sells.size:
+            # La venta solo aplica fuera de la zona de compra (rama elif de decide_transaction)
+            sells = sells[~(self._buy_trigger[sells] < price_change)]
+        return np.sort(buys), np.sort(sells)
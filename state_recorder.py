@@ -0,0 +1,107 @@
+# state_recorder.py
+"""
+    Registro compacto del estado de los agentes: un snapshot completo cada `snapshot_every` muestras
+    y, entre snapshots, solo los agentes cuyo saldo cambió. Cualquier ciclo registrado se reconstruye
+    a pedido partiendo del snapshot anterior y aplicando los deltas.
+"""
+
+import bisect
+
+
+class StateRecorder:
+    """
+    Estados por ciclo en forma de snapshots y deltas.
+    Un snapshot tiene la forma de WebBoot._snapshot_agent_states; un delta tiene las mismas claves
+    ('cycle', 'market_price', 'investors' y opcionalmente 'populations') con solo los agentes que
+    cambiaron, y además 'delta': True. Los deltas vacíos (ningún agente cambió) no se guardan.
+
+    Con keep_history=False (streaming) solo se conserva el último snapshot: la memoria no crece con
+    la cantidad de ciclos y el historial lo lleva quien consume los registros.
+    """
+
+    keep_history = True  # los checkpoints anteriores a keep_history guardaban todo
+
+    def __init__(self, snapshot_every: int = 50, sample_every: int = 1, keep_history: bool = True):
+        if snapshot_every < 1 or sample_every < 1:
+            raise ValueError("snapshot_every y sample_every deben ser mayores que 0")
+        self.snapshot_every = snapshot_every
+        self.sample_every = sample_every  # se registra un ciclo de cada sample_every
+        self.keep_history = keep_history
+        self.clear()
+
+    def clear(self):
+        self._snapshots = {}  # ciclo -> estado completo
+        self._snapshot_cycles = []
+        self._deltas = {}  # ciclo -> delta
+        self._cycles = []  # ciclos registrados, en orden
+        self._since_snapshot = 0
+
+    def should_sample(self, cycle: int) -> bool:
+        return cycle % self.sample_every == 0
+
+    def needs_snapshot(self) -> bool:
+        """True si la próxima muestra debe ser un snapshot completo."""
+        return not self._snapshots or self._since_snapshot >= self.snapshot_every
+
+    def add_snapshot(self, state: dict):
+        cycle = state['cycle']
+        if not self.keep_history:
+            self.clear()
+        self._snapshots[cycle] = state
+        self._snapshot_cycles.append(cycle)
+        self._cycles.append(cycle)
+        self._since_snapshot = 1
+
+    def add_delta(self, delta: dict):
+        """Registra un delta. Cuenta como muestra aunque no se guarde (vacío o sin historial)."""
+        self._since_snapshot += 1
+        if not self.keep_history or not (delta['investors'] or delta.get('populations')):
+            return
+        cycle = delta['cycle']
+        self._deltas[cycle] = delta
+        self._cycles.append(cycle)
+
+    def cycles(self) -> list:
+        return list(self._cycles)
+
+    def state_at(self, cycle: int) -> dict:
+        """
+        Estado completo en `cycle` (o en el último ciclo registrado antes, si ese ciclo no se muestreó
+        o no tuvo cambios). Lanza KeyError si no hay ningún ciclo registrado hasta `cycle`.
+        """
+        position = bisect.bisect_right(self._snapshot_cycles, cycle)
+        if position == 0:
+            raise KeyError(f"No hay estados registrados hasta el ciclo {cycle}")
+        base = self._snapshots[self._snapshot_cycles[position - 1]]
+        state = dict(base)
+        state['investors'] = dict(base['investors'])
+        if 'populations' in base:
+            state['populations'] = dict(base['populations'])
+
+        # Los deltas entre el snapshot y el ciclo pedido (las entradas se reemplazan, nunca se modifican)
+        start = bisect.bisect_right(self._cycles, base['cycle'])
+        stop = bisect.bisect_right(self._cycles, cycle)
+        for recorded in self._cycles[start:stop]:
+            delta = self._deltas[recorded]
+            state['cycle'] = recorded
+            state['market_price'] = delta['market_price']
+            state['investors'].update(delta['investors'])
+            if 'populations' in delta:
+                state.setdefault('populations', {}).update(delta['populations'])
+        return state
+
+    def latest(self) -> dict:
+        """
+        Estado completo del último ciclo registrado (None si no hay ninguno). Puede ser anterior al
+        ciclo actual de la corrida: el estado final sale de WebBoot.current_state().
+        """
+        return self.state_at(self._cycles[-1]) if self._cycles else None
+
+    def to_dict(self) -> dict:
+        """Forma serializable (JSON) del registro: snapshots y deltas en orden de ciclo."""
+        return {
+            'snapshot_every': self.snapshot_every,
+            'sample_every': self.sample_every,
+            'snapshots': [self._snapshots[cycle] for cycle in self._snapshot_cycles],
+            'deltas': [self._deltas[cycle] for cycle in self._cycles if cycle in self._deltas],
+        }
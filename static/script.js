@@ -1,5 +1,12 @@
 let priceChart = null;
 
+// Corridas más largas se piden en el formato binario columnar en lugar del stream ciclo a ciclo
+const COLUMNAR_MIMETYPE = 'application/vnd.simulador.columnar';
+const STREAM_MAX_CYCLES = 200;
+const MAX_SHOWN_TRANSACTIONS = 500;
+// Puntos del gráfico por consulta de rango (el servidor reduce la serie con min/max por bucket)
+const CHART_MAX_POINTS = 1000;
+
 document.getElementById('runSimulation').addEventListener('click', async () => {
     const cycles = parseInt(document.getElementById('cycles').value);
     const initialPrice = parseFloat(document.getElementById('initial_price').value);
@@ -9,34 +16,54 @@ document.getElementById('runSimulation').addEventListener('click', async () => {
     document.getElementById('results').classList.add('hidden');
     
     try {
-        const response = await fetch('/api/simulate', {
+        if (cycles > STREAM_MAX_CYCLES) {
+            await runColumnar(cycles, initialPrice);
+            return;
+        }
+        
+        const response = await fetch('/api/simulate/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Accept': 'application/x-ndjson',
             },
             body: JSON.stringify({
                 cycles: cycles,
                 initial_price: initialPrice
             })
         });
+        // Un error (400/500) trae un cuerpo JSON, no registros del stream
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
         
-        const data = await response.json();
-        
-        // Ocultar loading y mostrar resultados
-        document.getElementById('loading').classList.add('hidden');
-        document.getElementById('results').classList.remove('hidden');
-        
-        // Actualizar estadísticas
-        updateStatistics(data);
-        
-        // Actualizar gráfico
-        updateChart(data.price_history);
-        
-        // Actualizar información de agentes
-        updateAgentsInfo(data.agent_states);
+        // Ocultar loading y mostrar resultados apenas llega el primer ciclo
+        let started = false;
+        const transactions = [];
         
-        // Actualizar transacciones
-        updateTransactions(data.transactions);
+        await readNdjson(response, record => {
+            if (!started) {
+                started = true;
+                document.getElementById('loading').classList.add('hidden');
+                document.getElementById('results').classList.remove('hidden');
+                updateChart([]);
+                updateTransactions([]);
+            }
+            
+            if (record.type === 'cycle') {
+                // Actualizar gráfico y transacciones de forma incremental
+                appendChartPoint(record.price);
+                record.transactions.forEach(transaction => {
+                    transactions.push(transaction);
+                    appendTransaction(transaction, transactions.length === 1);
+                });
+            } else if (record.type === 'summary') {
+                // Actualizar estadísticas e información de agentes al final
+                if (record.statistics) {
+                    updateStatistics(record);
+                }
+                // Los ciclos traen solo deltas; el resumen trae el estado completo final
+                updateAgentsInfo(record.agent_state ? [record.agent_state] : []);
+            }
+        });
         
     } catch (error) {
         console.error('Error:', error);
@@ -45,6 +72,141 @@ document.getElementById('runSimulation').addEventListener('click', async () => {
     }
 });
 
+async function runColumnar(cycles, initialPrice) {
+    const response = await fetch('/api/simulate', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': COLUMNAR_MIMETYPE,
+        },
+        body: JSON.stringify({
+            cycles: cycles,
+            initial_price: initialPrice
+        })
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    
+    const { header, columns } = decodeColumnar(await response.arrayBuffer());
+    
+    document.getElementById('loading').classList.add('hidden');
+    document.getElementById('results').classList.remove('hidden');
+    
+    if (header.run_id) {
+        await loadPriceRange(header.run_id, 0, columns.price_history.length, columns.price_history.length);
+    } else {
+        updateChart(Array.from(columns.price_history));
+    }
+    
+    // Solo las últimas transacciones: armar miles de filas en el DOM no aporta
+    const total = columns.tx_cycle.length;
+    const transactions = [];
+    for (let i = Math.max(0, total - MAX_SHOWN_TRANSACTIONS); i < total; i++) {
+        transactions.push({
+            cycle: columns.tx_cycle[i],
+            sender: header.agents[columns.tx_sender[i]],
+            receiver: header.agents[columns.tx_receiver[i]],
+            action: header.actions[columns.tx_action[i]],
+            price: columns.tx_price[i],
+            count: columns.tx_count[i],
+        });
+    }
+    updateTransactions(transactions);
+    
+    if (header.statistics) {
+        updateStatistics(header);
+    }
+    updateAgentsInfo([lastColumnarState(header, columns)]);
+}
+
+async function loadPriceRange(runId, from, to, total) {
+    // Pide al servidor el rango [from, to) reducido y lo grafica; un click hace zoom alrededor del
+    // punto y doble click vuelve a la corrida completa
+    const params = new URLSearchParams({ from, to, max_points: CHART_MAX_POINTS });
+    const response = await fetch(`/api/runs/${runId}/prices?${params}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const range = await response.json();
+    
+    updateChart(range.y, range.x);
+    const canvas = document.getElementById('priceChart');
+    priceChart.options.onClick = (event) => {
+        const index = priceChart.scales.x.getValueForPixel(event.x);
+        const center = range.x[Math.max(0, Math.min(range.x.length - 1, Math.round(index)))];
+        const half = Math.max(CHART_MAX_POINTS / 2, Math.floor((range.to - range.from) / 8));
+        loadPriceRange(runId, Math.max(0, center - half), Math.min(total, center + half), total);
+    };
+    canvas.ondblclick = () => loadPriceRange(runId, 0, total, total);
+}
+
+function decodeColumnar(buffer) {
+    // 'SIMC' | versión (uint16) | reservado (uint16) | largo del encabezado (uint32) | encabezado JSON | columnas
+    const view = new DataView(buffer);
+    const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+    if (magic !== 'SIMC' || view.getUint16(4, true) !== 1) {
+        throw new Error('Formato columnar no compatible');
+    }
+    const headerLength = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+    const bodyStart = (12 + headerLength + 7) & ~7;
+    
+    // Cada columna está alineada a 8 bytes: se lee directamente como typed array, sin copiar
+    const arrayTypes = {
+        float64: Float64Array,
+        float32: Float32Array,
+        uint32: Uint32Array,
+        uint16: Uint16Array,
+        uint8: Uint8Array,
+    };
+    const columns = {};
+    Object.entries(header.columns).forEach(([name, [dtype, offset, length]]) => {
+        columns[name] = new arrayTypes[dtype](buffer, bodyStart + offset, length);
+    });
+    return { header, columns };
+}
+
+function lastColumnarState(header, columns) {
+    // Las filas de estado vienen en orden de ciclo: el último valor de cada agente es su estado final
+    const investors = {};
+    for (let i = 0; i < columns.state_agent.length; i++) {
+        const agentId = header.agents[columns.state_agent[i]];
+        if (!(agentId in header.risk_tolerance)) continue;
+        investors[agentId] = {
+            risk_tolerance: header.risk_tolerance[agentId],
+            fiat_balance: columns.state_fiat[i],
+            crypto_balance: columns.state_crypto[i],
+        };
+    }
+    return { investors };
+}
+
+async function readNdjson(response, onRecord) {
+    // Lee la respuesta línea por línea (un objeto JSON por línea)
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onRecord(JSON.parse(line));
+        }
+    }
+    
+    if (buffer.trim()) onRecord(JSON.parse(buffer));
+}
+
+function appendChartPoint(price) {
+    const data = priceChart.data;
+    data.labels.push(`Ciclo ${data.labels.length}`);
+    data.datasets[0].data.push(price);
+    priceChart.update('none');
+}
+
 function updateStatistics(data) {
     const stats = data.statistics;
     
@@ -65,7 +227,7 @@ function updateStatistics(data) {
     document.getElementById('stat-buys-sells').textContent = `${stats.buy_transactions} / ${stats.sell_transactions}`;
 }
 
-function updateChart(priceHistory) {
+function updateChart(priceHistory, cycles) {
     const ctx = document.getElementById('priceChart').getContext('2d');
     
     // Destruir gráfico anterior si existe
@@ -77,7 +239,7 @@ function updateChart(priceHistory) {
     priceChart = new Chart(ctx, {
         type: 'line',
         data: {
-            labels: priceHistory.map((_, index) => `Ciclo ${index}`),
+            labels: (cycles || priceHistory.map((_, index) => index)).map(cycle => `Ciclo ${cycle}`),
             datasets: [{
                 label: 'Precio de la Criptomoneda',
                 data: priceHistory,
@@ -86,7 +248,7 @@ function updateChart(priceHistory) {
                 borderWidth: 3,
                 fill: true,
                 tension: 0.4,
-                pointRadius: 4,
+                pointRadius: priceHistory.length > 100 ? 0 : 4,
                 pointHoverRadius: 6,
                 pointBackgroundColor: 'rgb(102, 126, 234)',
                 pointBorderColor: '#fff',
@@ -190,25 +352,31 @@ function updateTransactions(transactions) {
         return;
     }
     
-    transactions.forEach(transaction => {
-        const transactionItem = document.createElement('div');
-        transactionItem.className = `transaction-item ${transaction.action}`;
-        
-        const actionText = transaction.action === 'buy' ? 'COMPRA' : 'VENTA';
-        const actionEmoji = transaction.action === 'buy' ? '📈' : '📉';
-        
-        transactionItem.innerHTML = `
-            <div class="transaction-info">
-                <strong>${actionEmoji} ${actionText}</strong> por <strong>${transaction.receiver}</strong>
-                <br>
-                <small>Ciclo ${transaction.cycle}</small>
-            </div>
-            <div class="transaction-price">
-                $${transaction.price.toFixed(2)}
-            </div>
-        `;
-        
-        transactionsContainer.appendChild(transactionItem);
-    });
+    transactions.forEach(transaction => appendTransaction(transaction, false));
 }
 
+function appendTransaction(transaction, isFirst) {
+    const transactionsContainer = document.getElementById('transactions-list');
+    if (isFirst) {
+        transactionsContainer.innerHTML = '';
+    }
+    
+    const transactionItem = document.createElement('div');
+    transactionItem.className = `transaction-item ${transaction.action}`;
+    
+    const actionText = transaction.action === 'buy' ? 'COMPRA' : 'VENTA';
+    const actionEmoji = transaction.action === 'buy' ? '📈' : '📉';
+    
+    transactionItem.innerHTML = `
+        <div class="transaction-info">
+            <strong>${actionEmoji} ${actionText}</strong> por <strong>${transaction.receiver}</strong>
+            <br>
+            <small>Ciclo ${transaction.cycle}</small>
+        </div>
+        <div class="transaction-price">
+            $${transaction.price.toFixed(2)}
+        </div>
+    `;
+    
+    transactionsContainer.appendChild(transactionItem);
+}
@@ -0,0 +1,111 @@
+# sweep.py
+"""
+    Barrido Monte Carlo: corre muchas simulaciones con semilla sobre una grilla de escenarios
+    (precio inicial, ciclos, mezcla de tolerancias al riesgo) en un pool de procesos y devuelve
+    distribuciones agregadas en lugar de los datos crudos de cada corrida.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Mezcla por defecto: las tres personalidades de WebBoot.initialize_agents
+DEFAULT_RISK_MIX = (0.1, 0.6, 0.3)
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def derive_seeds(base_seed: int, count: int) -> List[int]:
+    """Semillas independientes y reproducibles para cada corrida del barrido."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(base_seed).spawn(count)]
+
+
+def run_path(task):
+    """
+    Corre una simulación (en un proceso del pool) y retorna solo su resumen:
+    precio final, PnL por inversor y cantidad de transacciones.
+    """
+    from agents import InvestorAgent
+    from simulation import WebBoot
+
+    initial_price, cycles, risk_mix, seed = task
+    simulator = WebBoot()
+    simulator.initialize_agents(initial_price=initial_price, seed=seed, risk_mix=risk_mix)
+    # Saldos de los agentes vivos (los estados registrados están redondeados y muestreados)
+    investors = [agent for agent in simulator.agents.values() if isinstance(agent, InvestorAgent)]
+    initial_wealth = [agent.fiat_balance + agent.crypto_balance * initial_price for agent in investors]
+    result = simulator.run_simulation(cycles=cycles)
+
+    final_price = result['price_history'][-1] if result['price_history'] else initial_price
+    pnl = [agent.fiat_balance + agent.crypto_balance * final_price - wealth
+           for agent, wealth in zip(investors, initial_wealth)]
+    return final_price, pnl, simulator.stats.buys + simulator.stats.sells
+
+
+def distribution(values) -> dict:
+    """Resumen de una distribución: media, desvío, extremos y percentiles."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return {'count': 0}
+    summary = {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{p}'] = float(value)
+    return summary
+
+
+def run_sweep(initial_prices: Sequence[float] = (100.0,), cycles: Sequence[int] = (8,),
+              risk_mixes: Sequence[Sequence[float]] = (DEFAULT_RISK_MIX,), paths: int = 100,
+              seed: int = 0, processes: Optional[int] = None) -> dict:
+    """
+    Ejecuta `paths` corridas por cada combinación de la grilla usando todos los núcleos.
+
+    Args:
+        initial_prices: Precios iniciales a barrer
+        cycles: Cantidades de ciclos a barrer
+        risk_mixes: Mezclas de tolerancias al riesgo (un inversor por valor)
+        paths: Corridas independientes por escenario
+        seed: Semilla base; cada corrida usa una semilla derivada (ver derive_seeds)
+        processes: Tamaño del pool (por defecto, la cantidad de núcleos)
+
+    Returns:
+        Diccionario con un resumen por escenario (distribuciones de precio final, PnL y transacciones)
+    """
+    if paths < 1:
+        raise ValueError("paths debe ser al menos 1")
+    if any(n_cycles < 1 for n_cycles in cycles):
+        raise ValueError("Cada valor de cycles debe ser al menos 1")
+    scenarios = list(itertools.product(initial_prices, cycles, [tuple(mix) for mix in risk_mixes]))
+    seeds = derive_seeds(seed, len(scenarios) * paths)
+    tasks = [(price, n_cycles, mix, seeds[i * paths + j])
+             for i, (price, n_cycles, mix) in enumerate(scenarios) for j in range(paths)]
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(run_path, tasks, chunksize=chunksize))
+
+    summaries = []
+    for i, (price, n_cycles, mix) in enumerate(scenarios):
+        runs = results[i * paths:(i + 1) * paths]
+        pnl = np.array([run[1] for run in runs], dtype=np.float64)
+        summaries.append({
+            'initial_price': price,
+            'cycles': n_cycles,
+            'risk_mix': list(mix),
+            'seeds': seeds[i * paths:(i + 1) * paths],
+            'final_price': distribution([run[0] for run in runs]),
+            'trades': distribution([run[2] for run in runs]),
+            'pnl': distribution(pnl.ravel()),
+            'pnl_by_investor': [dict(distribution(pnl[:, k]), risk_tolerance=risk)
+                                for k, risk in enumerate(mix)],
+        })
+
+    return {'seed': seed, 'paths': paths, 'processes': processes, 'scenarios': summaries}
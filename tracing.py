@@ -0,0 +1,322 @@
+# tracing.py
+"""
+    Trazas estructuradas de la simulación, en lugar de print(): cada evento tiene un tipo, un nivel y
+    campos tipados. Los eventos por debajo del nivel configurado no se arman: en los puntos calientes
+    el llamador compara el nivel antes de llamar, así con el nivel por defecto (WARNING, sin trazas)
+    cada punto cuesta una comparación.
+
+    Destinos:
+        RingBufferSink  los últimos N eventos en memoria
+        FileSink        archivo binario append-only (strings internados, campos empaquetados)
+        PrintSink       texto por stdout, con el formato de los antiguos print()
+
+    Uso:
+        python -m tracing replay corrida.trace [--event fill] [--agent InversorMedio_C] [--from 10] [--to 20]
+        python -m tracing stats corrida.trace
+"""
+
+import atexit
+import json
+import os
+import struct
+import sys
+from collections import Counter, deque, namedtuple
+
+TRACE = 5  # cada mensaje enviado y recibido
+DEBUG = 10  # decisiones y negociación
+INFO = 20  # precios y transacciones
+WARNING = 30
+OFF = 100
+
+LEVELS = {'trace': TRACE, 'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'off': OFF}
+
+TRACE_MAGIC = b'SIMTRC1\n'
+
+
+class EventType:
+    """
+    Tipo de evento: código, nivel, campos (nombre, tipo) y plantilla de texto.
+    Tipos de campo: 's' string (internado en archivo), 'd' float, 'q' entero.
+    """
+    __slots__ = ('code', 'name', 'level', 'fields', 'template', 'struct')
+
+    def __init__(self, code, name, level, fields, template):
+        self.code = code
+        self.name = name
+        self.level = level
+        self.fields = fields
+        self.template = template
+        self.struct = struct.Struct('<BI' + ''.join('I' if kind == 's' else kind for _, kind in fields))
+
+
+EVENT_TYPES = {}
+
+
+def _event_type(code, name, level, fields, template):
+    event = EventType(code, name, level, fields, template)
+    EVENT_TYPES[name] = event
+    return event
+
+
+AGENT_INIT = _event_type(1, 'agent_init', INFO, [('agent', 's')], "Agente {agent} inicializado.")
+MARKET_OPEN = _event_type(2, 'market_open', INFO, [('market', 's'), ('price', 'd')],
+                          "Precio inicial de la criptomoneda: ${price:.2f}")
+INVESTOR_INIT = _event_type(3, 'investor_init', INFO, [('agent', 's'), ('risk_tolerance', 'd')],
+                            "Agente {agent} inicializado. Riesgo: {risk_tolerance:.2f}")
+POPULATION_INIT = _event_type(4, 'population_init', INFO, [('agent', 's'), ('size', 'q'), ('risk_tolerance', 'd')],
+                              "Poblacion {agent}: {size} inversores (Riesgo medio: {risk_tolerance:.2f})")
+PRICE = _event_type(5, 'price', INFO, [('market', 's'), ('price', 'd')],
+                    "--- Atencion! Nuevo Precio: ${price:.2f} ---")
+EXECUTED = _event_type(6, 'executed', INFO, [('market', 's'), ('agent', 's'), ('action', 's'), ('price', 'd')],
+                       "*** TRANSACCIÓN EJECUTADA: {agent} realiza {action} en ${price:.2f} ***")
+FILL = _event_type(7, 'fill', INFO, [('agent', 's'), ('action', 's'), ('price', 'd'), ('fiat_balance', 'd'),
+                                     ('crypto_balance', 'd')],
+                   "[{agent} INFORM: {action} OK en ${price:.2f}] Saldo Fiat: ${fiat_balance:.2f} | "
+                   "Saldo Cripto: {crypto_balance:.2f}")
+FILL_FAILED = _event_type(8, 'fill_failed', INFO, [('agent', 's')], "[{agent} INFORM: Transacción fallida.]")
+DECISION = _event_type(9, 'decision', DEBUG, [('agent', 's'), ('action', 's'), ('price_change', 'd')],
+                       "[{agent} DECISION: {action} | Var: {price_change:.2%}] -> Enviando CFP al Mercado...")
+WAITING = _event_type(10, 'waiting', DEBUG, [('agent', 's')], "{agent}: Esperando más datos de mercado.")
+PROPOSE_ACCEPTED = _event_type(11, 'propose_accepted', DEBUG, [('agent', 's'), ('price', 'd'), ('action', 's')],
+                               "[{agent} PROPOSE RECIBIDO: ${price:.2f}] -> Aceptando oferta para {action}.")
+PROPOSE_REJECTED = _event_type(12, 'propose_rejected', DEBUG, [('agent', 's'), ('price', 'd')],
+                               "[{agent} PROPOSE RECIBIDO: ${price:.2f}] -> Sin acción pendiente, rechazando.")
+SEND = _event_type(13, 'send', TRACE, [('sender', 's'), ('receiver', 's'), ('performative', 's')],
+                   "ENVIADO: [{sender} -> {receiver}] {performative}")
+RECEIVE = _event_type(14, 'receive', TRACE, [('receiver', 's'), ('sender', 's'), ('performative', 's')],
+                      "RECIBIDO por {receiver}: [{sender} -> {receiver}] {performative}")
+
+TraceRecord = namedtuple('TraceRecord', ['event', 'tick', 'fields'])
+
+
+def _text(value) -> str:
+    # Los receptores multicast son tuplas de ids
+    if isinstance(value, str):
+        return value
+    if isinstance(value, tuple):
+        return ','.join(map(str, value))
+    return str(value)
+
+
+def format_record(record: TraceRecord) -> str:
+    """Texto de un evento, con el formato de los antiguos print()."""
+    return f"[t={record.tick}] " + EVENT_TYPES[record.event].template.format(**record.fields)
+
+
+class RingBufferSink:
+    """Los últimos `capacity` eventos en memoria, sin serializar."""
+
+    def __init__(self, capacity: int = 100_000):
+        self._events = deque(maxlen=capacity)
+
+    def write(self, event, tick, values):
+        self._events.append((event, tick, values))
+
+    def records(self):
+        for event, tick, values in list(self._events):
+            yield TraceRecord(event.name, tick,
+                              {name: _text(value) if kind == 's' else value
+                               for (name, kind), value in zip(event.fields, values)})
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """
+    Archivo binario append-only. Estructura: TRACE_MAGIC | largo (uint32) + esquema JSON | registros.
+    Cada registro empieza con el código del tipo (uint8); el código 0 define un string internado
+    (id uint32, largo uint16, UTF-8) y el resto son eventos: tick (uint32) y los campos empaquetados.
+    """
+
+    _STRING = struct.Struct('<BIH')
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._strings = {}
+        self._buffer = bytearray()
+        self._file = open(path, 'wb')
+        schema = json.dumps({event.code: [event.name, event.level, event.fields]
+                             for event in EVENT_TYPES.values()}).encode('utf-8')
+        self._file.write(TRACE_MAGIC + struct.pack('<I', len(schema)) + schema)
+        atexit.register(self.close)
+
+    def _intern(self, value):
+        text = _text(value)
+        index = self._strings.get(text)
+        if index is None:
+            index = self._strings[text] = len(self._strings)
+            # El largo es de 16 bits: se corta en bytes, sin partir un carácter multibyte
+            data = text.encode('utf-8')[:0xFFFF].decode('utf-8', 'ignore').encode('utf-8')
+            self._buffer += self._STRING.pack(0, index, len(data)) + data
+        return index
+
+    def write(self, event, tick, values):
+        packed = [self._intern(value) if kind == 's' else value for (_, kind), value in zip(event.fields, values)]
+        self._buffer += event.struct.pack(event.code, tick, *packed)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None and self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class PrintSink:
+    """Texto por stdout (el comportamiento anterior a las trazas)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, event, tick, values):
+        fields = {name: _text(value) if kind == 's' else value for (name, kind), value in zip(event.fields, values)}
+        print(format_record(TraceRecord(event.name, tick, fields)), file=self.stream or sys.stdout)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    """
+    Punto único de emisión. `level` es público para que los puntos calientes comparen antes de armar
+    los argumentos:  if TRACER.level <= DEBUG: TRACER.emit(DECISION, ...)
+    `tick` lo actualiza WebBoot en cada ciclo (con varias corridas a la vez es el de la última).
+    """
+
+    def __init__(self):
+        self.level = WARNING
+        self.sink = None
+        self.tick = 0
+
+    def configure(self, level=WARNING, sink=None):
+        """Cambia el nivel y el destino (por defecto, un RingBufferSink). Cierra el destino anterior."""
+        if isinstance(level, str):
+            if level.lower() not in LEVELS:
+                raise ValueError(f"Nivel de traza desconocido: {level!r} (opciones: {', '.join(LEVELS)})")
+            level = LEVELS[level.lower()]
+        if self.sink is not None and self.sink is not sink:
+            self.sink.close()
+        self.sink = sink if sink is not None else RingBufferSink()
+        self.level = level
+
+    def emit(self, event: EventType, *values):
+        if event.level >= self.level and self.sink is not None:
+            self.sink.write(event, self.tick, values)
+
+    def flush(self):
+        if self.sink is not None:
+            self.sink.flush()
+
+
+TRACER = Tracer()
+
+
+def configure_from_env():
+    """
+    Configura TRACER con SIMULADOR_TRACE_LEVEL y, opcionalmente, SIMULADOR_TRACE_FILE.
+    Los procesos hijos (workers de barridos o de mercados) solo escriben trazas si la ruta tiene
+    "{pid}", para no pisar el archivo del proceso principal.
+    """
+    level = os.environ.get('SIMULADOR_TRACE_LEVEL')
+    if not level:
+        return
+    path = os.environ.get('SIMULADOR_TRACE_FILE')
+    if path:
+        import multiprocessing
+        if '{pid}' not in path and multiprocessing.parent_process() is not None:
+            return
+        path = path.replace('{pid}', str(os.getpid()))
+    TRACER.configure(level, FileSink(path) if path else None)
+
+
+def read_trace(path: str):
+    """Lee un archivo de FileSink y produce sus eventos (TraceRecord) en orden."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} no es un archivo de trazas de simulación")
+    offset = len(TRACE_MAGIC)
+    (schema_size,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    schema = json.loads(data[offset:offset + schema_size])
+    offset += schema_size
+    events = {int(code): EventType(int(code), name, level, [tuple(field) for field in fields], '')
+              for code, (name, level, fields) in schema.items()}
+
+    strings = {}
+    while offset < len(data):
+        code = data[offset]
+        if code == 0:
+            _, index, size = FileSink._STRING.unpack_from(data, offset)
+            offset += FileSink._STRING.size
+            strings[index] = data[offset:offset + size].decode('utf-8')
+            offset += size
+            continue
+        event = events[code]
+        _, tick, *values = event.struct.unpack_from(data, offset)
+        offset += event.struct.size
+        yield TraceRecord(event.name, tick, {name: strings[value] if kind == 's' else value
+                                             for (name, kind), value in zip(event.fields, values)})
+
+
+def filter_records(records, events=None, agent=None, start=None, stop=None):
+    """Filtra por tipos de evento, por agente (cualquier campo string) y por rango de ticks [start, stop]."""
+    for record in records:
+        if events and record.event not in events:
+            continue
+        if start is not None and record.tick < start:
+            continue
+        if stop is not None and record.tick > stop:
+            continue
+        if agent is not None and agent not in (value for value in record.fields.values() if isinstance(value, str)):
+            continue
+        yield record
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    replay = commands.add_parser('replay', help='imprime los eventos de una traza')
+    replay.add_argument('path')
+    replay.add_argument('--event', action='append', help='tipo de evento (se puede repetir)')
+    replay.add_argument('--agent', help='solo eventos de este agente')
+    replay.add_argument('--from', dest='start', type=int, help='primer tick')
+    replay.add_argument('--to', dest='stop', type=int, help='último tick')
+    replay.add_argument('--json', action='store_true', help='un objeto JSON por línea')
+
+    stats = commands.add_parser('stats', help='cantidad de eventos por tipo')
+    stats.add_argument('path')
+
+    args = parser.parse_args()
+    if args.command == 'stats':
+        counts = Counter(record.event for record in read_trace(args.path))
+        for name, count in counts.most_common():
+            print(f"{name:>18} {count:>10,}")
+        return
+
+    try:
+        for record in filter_records(read_trace(args.path), args.event, args.agent, args.start, args.stop):
+            print(json.dumps(record._asdict()) if args.json else format_record(record))
+    except BrokenPipeError:
+        # La salida se cortó (p. ej. | head): se descarta lo que queda sin error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+if __name__ == '__main__':
+    main()